@@ -49,6 +49,7 @@ INSTALLED_APPS = [
     "members.apps.MembersConfig",
     "polls.apps.PollsConfig",
     "stats.apps.StatsConfig",
+    "shared.apps.SharedConfig",
     "easy_thumbnails",
     "image_cropping",
     "crispy_forms",
@@ -193,6 +194,14 @@ AUTH_USER_MODEL = "users.User"
 
 EMAIL_BACKEND = "django.core.mail.backends.console.EmailBackend"
 
+# Outbox for sending emails in batches over one SMTP connection, see shared/tasks.py
+EMAIL_USE_OUTBOX = os.getenv("EMAIL_USE_OUTBOX", "False") == "True"
+EMAIL_OUTBOX_BATCH_SIZE = 100
+EMAIL_OUTBOX_FLUSH_INTERVAL = 30  # seconds
+EMAIL_OUTBOX_MAX_ATTEMPTS = 5
+# a batch still being sent after this long is presumed lost and sent again
+EMAIL_OUTBOX_CLAIM_TIMEOUT = 10 * 60  # seconds
+
 # DigitalOcean Spaces
 
 STATICFILES_LOCATION = "static"
@@ -222,6 +231,13 @@ CELERY_ACCEPT_CONTENT = ["application/json"]
 CELERY_TASK_SERIALIZER = "json"
 CELERY_RESULT_SERIALIZER = "json"
 CELERY_TIMEZONE = TIME_ZONE
+CELERY_BEAT_SCHEDULE = {
+    # picks up emails left in the outbox when a scheduled flush was lost
+    "sweep-outbox": {
+        "task": "send_queued_emails",
+        "schedule": 5 * 60,  # seconds
+    },
+}
 
 CACHES = {
     "default": {
@@ -248,9 +264,15 @@ TINYMCE_DEFAULT_CONFIG = {
     "removeformat | help",
 }
 
+# Compute salary survey statistics with the NumPy engine in stats.engine, which
+# needs the 'survey' extra
+STATS_USE_NUMPY_ENGINE = os.getenv("STATS_USE_NUMPY_ENGINE", "False") == "True"
+
 SALARY_URL = os.getenv("SALARY_URL")
 
 SLACK_INVITATION_LINK = os.getenv("SLACK_INVITATION_LINK")
 
 MAILERLITE_API_KEY = os.getenv("MAILERLITE_API_KEY")
 MAILERLITE_API_URL = "https://connect.mailerlite.com/api"
+MAILERLITE_REQUESTS_PER_MINUTE = 120
+MAILERLITE_POOL_SIZE = 8  # matches the celery worker concurrency
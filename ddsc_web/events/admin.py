@@ -1,5 +1,6 @@
 from django.contrib import admin
 
+from .forms import EventRegistrationAdminForm
 from .models import Event, EventImage, Address, EventRegistration, RegistrationTerms
 from image_cropping import ImageCroppingMixin
 from import_export import resources
@@ -48,6 +49,7 @@ class EventRegistrationResource(resources.ModelResource):
 
 @admin.register(EventRegistration)
 class EventRegistrationAdmin(ExportMixin, admin.ModelAdmin):
+    form = EventRegistrationAdminForm
     resource_class = EventRegistrationResource
     list_display = ("event", "user", "created", "status")
     list_filter = ("status", "event__title")
@@ -74,6 +76,6 @@ class EventAdmin(admin.ModelAdmin):
     ]
 
     def number_of_registrations(self, obj):
-        return obj.registrations.count()
+        return obj.seats_taken
 
     number_of_registrations.short_description = "Number of registrations"
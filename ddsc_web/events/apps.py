@@ -6,4 +6,5 @@ class EventsConfig(AppConfig):
     name = "events"
 
     def ready(self):
+        import events.signals
         import events.tasks
@@ -25,7 +25,7 @@ from .layouts import (
     accept_terms_layout,
     registration_terms_field_layout,
 )
-from .models import Event, Address, EventImage, RegistrationTerms
+from .models import Event, Address, EventImage, EventRegistration, RegistrationTerms
 
 User = get_user_model()
 
@@ -229,3 +229,20 @@ class EventImageForm(forms.ModelForm):
                 css_class="col-9 mx-auto",
             ),
         )
+
+
+class EventRegistrationAdminForm(forms.ModelForm):
+    class Meta:
+        model = EventRegistration
+        fields = "__all__"
+
+    def clean(self):
+        cleaned_data = super().clean()
+        event = cleaned_data.get("event")
+        # EventRegistration.save takes the seat, this only reports a full event
+        # as a form error instead of an EventSoldOutError
+        if self.instance._state.adding and event and event.is_sold_out():
+            raise forms.ValidationError(
+                _("Der er desværre ikke flere pladser til eventet")
+            )
+        return cleaned_data
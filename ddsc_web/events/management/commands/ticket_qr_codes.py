@@ -0,0 +1,61 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Count
+
+from events.fields import generate_token
+from events.models import EventRegistration
+
+
+class Command(BaseCommand):
+    help = (
+        "Prepares registrations for the ticket QR code endpoint and optionally "
+        "deletes the QR code images stored in private storage"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--delete-files",
+            action="store_true",
+            help="Delete stored QR code images and clear the qr_code field",
+        )
+
+    def handle(self, *args, **options):
+        backfilled = self.__backfill_tokens()
+        self.stdout.write(
+            self.style.SUCCESS(f"Backfilled tokens for {backfilled} registrations")
+        )
+        if options["delete_files"]:
+            deleted = self.__delete_stored_qr_codes()
+            self.stdout.write(
+                self.style.SUCCESS(f"Deleted {deleted} stored QR code images")
+            )
+
+    def __backfill_tokens(self):
+        """
+        Registrations created before the token field was added share the same
+        token, which makes the signed ticket data ambiguous within an event.
+        Keep the token of the first registration and issue new ones to the rest.
+        """
+        duplicated = (
+            EventRegistration.objects.values("event", "token")
+            .annotate(registrations=Count("id"))
+            .filter(registrations__gt=1)
+        )
+        backfilled = 0
+        for group in duplicated:
+            registrations = EventRegistration.objects.filter(
+                event=group["event"], token=group["token"]
+            ).order_by("id")[1:]
+            for registration in registrations:
+                registration.token = generate_token()
+                registration.save(update_fields=["token"])
+                backfilled += 1
+        return backfilled
+
+    def __delete_stored_qr_codes(self):
+        registrations = EventRegistration.objects.exclude(qr_code="")
+        deleted = 0
+        for registration in registrations.iterator():
+            registration.qr_code.delete(save=False)
+            deleted += 1
+        registrations.update(qr_code="")
+        return deleted
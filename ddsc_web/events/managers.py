@@ -1,7 +1,37 @@
 from django.db import models
+from django.db.models import F
 from django.utils import timezone
 
 
-class ComingEvents(models.Manager):
+class EventQuerySet(models.QuerySet):
+    def with_listing_data(self):
+        """
+        Fetch everything the event cards need up front: the address and the images.
+        EventImage is ordered by 'order', so 'images.first' is served from the
+        prefetch cache.
+        """
+        return self.select_related("address").prefetch_related("images")
+
+    def reserve_seat(self, event_id: int) -> bool:
+        """
+        Take a seat with a single conditional UPDATE. The row lock taken by the
+        update serializes concurrent signups, so an event can never be oversold.
+        Returns False if the event is sold out.
+        """
+        updated = self.filter(
+            pk=event_id,
+            seats_taken__lt=F("maximum_attendees"),
+        ).update(seats_taken=F("seats_taken") + 1)
+        return updated == 1
+
+    def release_seat(self, event_id: int) -> bool:
+        updated = self.filter(
+            pk=event_id,
+            seats_taken__gt=0,
+        ).update(seats_taken=F("seats_taken") - 1)
+        return updated == 1
+
+
+class ComingEvents(models.Manager.from_queryset(EventQuerySet)):
     def get_queryset(self):
         return super().get_queryset().filter(end_datetime__gt=timezone.now())
@@ -0,0 +1,40 @@
+# Generated by Django 4.1.5 on 2026-10-18 11:59
+
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count_seats_taken(apps, schema_editor):
+    Event = apps.get_model("events", "Event")
+    EventRegistration = apps.get_model("events", "EventRegistration")
+    registrations = (
+        EventRegistration.objects.filter(event=OuterRef("pk"))
+        .order_by()
+        .values("event")
+        .annotate(total=Count("pk"))
+        .values("total")
+    )
+    Event.objects.update(
+        seats_taken=Coalesce(Subquery(registrations, output_field=IntegerField()), 0)
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("events", "0025_registrationterms_created_registrationterms_updated"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="event",
+            name="seats_taken",
+            field=models.PositiveIntegerField(
+                default=0,
+                editable=False,
+                help_text="Antal tilmeldte. Vedligeholdes ved til- og afmelding",
+            ),
+        ),
+        migrations.RunPython(count_seats_taken, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 4.1.5 on 2026-10-18 12:00
+
+import ddsc_web.settings.custom_storages
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("events", "0026_event_seats_taken"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="eventregistration",
+            name="qr_code",
+            field=models.ImageField(
+                blank=True,
+                help_text="QR kode for tilmeldingen.",
+                storage=ddsc_web.settings.custom_storages.PrivateMediaStorage(),
+                upload_to="event/registrations/%Y/%m/%d/",
+            ),
+        ),
+    ]
@@ -1,19 +1,15 @@
-import qrcode
 from django.contrib.auth import get_user_model
-from django.core.files import File
-from django.core.files.temp import NamedTemporaryFile
-from django.db import models
+from django.db import models, transaction
 from django.urls import reverse
 from django.utils.text import slugify
 from django.utils.translation import gettext_lazy as _
 from image_cropping import ImageCropField, ImageRatioField
 from shared.models import AbstractAddress
 from tinymce.models import HTMLField
-from django.conf import settings
 from ddsc_web.settings.custom_storages import PrivateMediaStorage
 
 from .fields import TokenField
-from .managers import ComingEvents
+from .managers import ComingEvents, EventQuerySet
 from .signing import sign_ticket_data
 from .validators import validate_image_order, validate_maximum_attendees
 
@@ -23,6 +19,10 @@ QR_CODE_UPLOAD_FOLDER = "event/registrations/%Y/%m/%d/"
 User = get_user_model()
 
 
+class EventSoldOutError(Exception):
+    pass
+
+
 class Event(models.Model):
     class SignupTypeChoice(models.TextChoices):
         DDSC_SIGNUP = "DDSC", _("DDSC tilmelding")
@@ -75,6 +75,11 @@ class Event(models.Model):
     maximum_attendees = models.PositiveIntegerField(
         validators=[validate_maximum_attendees]
     )
+    seats_taken = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        help_text=_("Antal tilmeldte. Vedligeholdes ved til- og afmelding"),
+    )
     registration_terms = models.ForeignKey(
         "RegistrationTerms",
         on_delete=models.CASCADE,
@@ -84,7 +89,7 @@ class Event(models.Model):
         related_name="events",
     )
     coming_events = ComingEvents()
-    objects = models.Manager()
+    objects = EventQuerySet.as_manager()
 
     def get_absolute_url(self):
         return reverse("events:register", args=[self.id, self.slug])
@@ -96,14 +101,22 @@ class Event(models.Model):
         return self.images.first()
 
     def has_available_tickets(self):
-        return self.attendees.all().count() < self.maximum_attendees
+        return self.seats_taken < self.maximum_attendees
 
     def is_sold_out(self):
-        return self.attendees.all().count() >= self.maximum_attendees
+        return self.seats_taken >= self.maximum_attendees
 
     def save(self, *args, **kwargs):
         # if not self.slug:
         self.slug = slugify(self.title)
+        if not self._state.adding and kwargs.get("update_fields") is None:
+            # seats_taken is maintained with conditional updates.
+            # Never write back a value that may have gone stale since it was loaded.
+            kwargs["update_fields"] = [
+                field.name
+                for field in self._meta.concrete_fields
+                if not field.primary_key and field.name != "seats_taken"
+            ]
         super().save(*args, **kwargs)
 
     def __str__(self):
@@ -161,6 +174,7 @@ class EventRegistration(models.Model):
         upload_to=QR_CODE_UPLOAD_FOLDER,
         help_text=_("QR kode for tilmeldingen."),
         storage=PrivateMediaStorage(),
+        blank=True,
     )
     slug = models.SlugField(max_length=200, blank=True)
     token = TokenField()
@@ -176,34 +190,21 @@ class EventRegistration(models.Model):
     def save(self, *args, **kwargs):
         if not self.slug:
             self.slug = slugify(f"{self.event.title} {self.user.first_name}")
-        self.generate_qrcode()
-        super(EventRegistration, self).save(*args, **kwargs)
-
-    def generate_qrcode(self):
-        qr = qrcode.QRCode(
-            version=1,
-            error_correction=qrcode.constants.ERROR_CORRECT_L,
-            box_size=10,
-            border=4,
-        )
-        ticket_data = {
-            "event_id": self.event.pk,
-            "token": self.token,
-        }
-        signed_data = sign_ticket_data(ticket_data)
-        qr.add_data(settings.CONSUME_TICKET_ENDPOINT + signed_data)
-        qr.make(fit=True)
-
-        filename = "event_registration.png"
-
-        temp_image_file = NamedTemporaryFile()
-
-        img = qr.make_image()
-        img.save(temp_image_file.name)
-
-        with open(temp_image_file.name, "rb") as reopen:
-            django_file = File(reopen)
-            self.qr_code.save(filename, django_file, save=False)
+        if not self._state.adding:
+            super(EventRegistration, self).save(*args, **kwargs)
+            return
+
+        with transaction.atomic():
+            if not Event.objects.reserve_seat(self.event_id):
+                raise EventSoldOutError(f"{self.event} is sold out")
+            super(EventRegistration, self).save(*args, **kwargs)
+        self.event.seats_taken += 1
+
+    def get_signed_ticket_data(self):
+        return sign_ticket_data({"event_id": self.event_id, "token": self.token})
+
+    def get_qr_code_url(self):
+        return reverse("events:ticket_qr_code", args=[self.get_signed_ticket_data()])
 
     def __str__(self):
         return f"Registration: {self.user} - {self.event} - {self.created.date()}"
@@ -0,0 +1,9 @@
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+
+from .models import Event, EventRegistration
+
+
+@receiver(post_delete, sender=EventRegistration)
+def release_event_seat(sender, instance, **kwargs):
+    Event.objects.release_seat(instance.event_id)
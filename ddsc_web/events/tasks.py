@@ -1,42 +1,48 @@
-from pathlib import Path
-
 from celery.utils.log import get_task_logger
 from ddsc_web.celery import celery_app
 from django.contrib.auth import get_user_model
-from django.core.files.temp import NamedTemporaryFile
+from django.core.cache import cache
 from django.template.loader import render_to_string
 from django.utils.translation import gettext_lazy as _
-from shared.emails import create_email_with_images
+from shared.emails import create_email_with_images, downscale_image
+from shared.tasks import send_or_queue_email
 
-from .models import EventRegistration
+from .models import Event, EventRegistration
+from .tickets import render_ticket_qr_code
 
 User = get_user_model()
 
 logger = get_task_logger(__name__)
 
+QR_CODE_CONTENT_ID = "ticket-qr-code"
+EVENT_IMAGE_CONTENT_ID = "event-image"
+EVENT_EMAIL_IMAGE_WIDTH = 600
+EVENT_EMAIL_IMAGE_TIMEOUT = 60 * 60 * 24 * 30
+
 
-# TODO: This task now works, but has alot of I/O operations I am not sure we need them all.
-# There might be a much better way to just download the file directly from S3 and point to the path.
-# However, one upside of this method is, that the tempfiles are destroyed as soon as the file is closed.
-# We should implement some context manager for this task to clean up the files if we hit an error.
 @celery_app.task(name="send_ticket_mail")
 def send_ticket_mail(user_id, event_registration_id):
-    registration = EventRegistration.objects.get(pk=event_registration_id)
+    registration = EventRegistration.objects.select_related("event").get(
+        pk=event_registration_id
+    )
     user = User.objects.get(pk=user_id)
     mail_subject = f"{_('Din billet til')} {registration.event.title}"
 
-    qr_code_temp = NamedTemporaryFile()
-    event_image_temp = NamedTemporaryFile()
-
-    write_qr_code_to_tempfile(qr_code_temp, registration)
-    write_event_image_to_tempfile(event_image_temp, registration)
+    images = {
+        QR_CODE_CONTENT_ID: render_ticket_qr_code(
+            registration.get_signed_ticket_data()
+        ),
+    }
+    event_image = get_event_email_image(registration.event)
+    if event_image:
+        images[EVENT_IMAGE_CONTENT_ID] = event_image
 
     html_message = render_to_string(
         "events/ticket_email.html",
         {
             "registration": registration,
-            "qr_code_name": Path(qr_code_temp.name).name,
-            "event_image_name": Path(event_image_temp.name).name,
+            "qr_code_name": QR_CODE_CONTENT_ID,
+            "event_image_name": EVENT_IMAGE_CONTENT_ID if event_image else None,
         },
     )
     email = create_email_with_images(
@@ -45,22 +51,27 @@ def send_ticket_mail(user_id, event_registration_id):
         html_content=html_message,
         sender=_("DDSC event billet"),
         recipient=user.email,
-        image_paths=[Path(qr_code_temp.name), Path(event_image_temp.name)],
+        images=images,
     )
-    email.send()
-    qr_code_temp.close()
-    event_image_temp.close()
-
+    send_or_queue_email(email)
 
-def write_qr_code_to_tempfile(file, registration: EventRegistration):
-    qr_code_content = registration.qr_code.read()
-    file.write(qr_code_content)
-    file.flush()
-    return True
 
+def get_event_email_image(event: Event) -> bytes | None:
+    """
+    The first event image downscaled for emails. It is shared by every ticket
+    mail for the event, so it is kept in the cache instead of being downloaded
+    from storage for each mail. The media storages never overwrite files, so a
+    replaced image gets a new name and the key needs no storage lookup.
+    """
+    event_image = event.get_first_image()
+    if event_image is None:
+        return None
 
-def write_event_image_to_tempfile(file, registration: EventRegistration):
-    event_image_content = registration.event.get_first_image().image.read()
-    file.write(event_image_content)
-    file.flush()
-    return True
+    image = event_image.image
+    cache_key = f"email_image:{event_image.pk}:{image.name}"
+    content = cache.get(cache_key)
+    if content is None:
+        with image.open("rb"):
+            content = downscale_image(image.read(), EVENT_EMAIL_IMAGE_WIDTH)
+        cache.set(cache_key, content, EVENT_EMAIL_IMAGE_TIMEOUT)
+    return content
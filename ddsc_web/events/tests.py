@@ -1,3 +1,203 @@
-from django.test import TestCase
+import tempfile
+from datetime import timedelta
+from io import BytesIO
+from unittest import mock
 
-# Create your tests here.
+from django.core import mail
+from django.core.cache import cache
+from django.core.files.storage import FileSystemStorage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from PIL import Image
+
+from .models import Address, Event, EventImage, EventRegistration, EventSoldOutError
+from .tasks import EVENT_EMAIL_IMAGE_WIDTH, downscale_image, send_ticket_mail
+from users.models import User
+
+
+def create_event(title: str, maximum_attendees: int = 10) -> Event:
+    start = timezone.now() + timedelta(days=7)
+    event = Event.objects.create(
+        title=title,
+        signup_type=Event.SignupTypeChoice.DDSC_SIGNUP,
+        location="DDSC",
+        start_datetime=start,
+        end_datetime=start + timedelta(hours=2),
+        summary="Summary",
+        description="Description",
+        maximum_attendees=maximum_attendees,
+    )
+    Address.objects.create(
+        event=event, address="Vej 1", postal_code=2100, city="København"
+    )
+    return event
+
+
+def create_user(email: str) -> User:
+    return User.objects.create_user(email=email, password="password")
+
+
+@override_settings(
+    DEFAULT_FILE_STORAGE="django.core.files.storage.FileSystemStorage",
+)
+class EventListQueryCountTest(TestCase):
+    # session-less anonymous request: the event query plus the image prefetch
+    EXPECTED_QUERIES = 2
+
+    def setUp(self):
+        self.users = [create_user(f"user{i}@ddsc.io") for i in range(3)]
+
+    def create_events_with_attendees(self, titles: range):
+        for i in titles:
+            event = create_event(f"Event {i}")
+            # only the file names are needed to list the images
+            EventImage.objects.bulk_create(
+                EventImage(
+                    event=event, image=f"images/event-{i}-{order}.jpg", order=order
+                )
+                for order in [2, 1]
+            )
+            for user in self.users:
+                EventRegistration.objects.create(event=event, user=user)
+
+    def test_event_list_query_count_is_constant(self):
+        self.create_events_with_attendees(range(1))
+        with self.assertNumQueries(self.EXPECTED_QUERIES):
+            self.client.get(reverse("events:event_list"))
+
+        self.create_events_with_attendees(range(1, 6))
+        with self.assertNumQueries(self.EXPECTED_QUERIES):
+            response = self.client.get(reverse("events:event_list"))
+        self.assertEqual(
+            sorted(image.image.name for _, image in response.context["events"]),
+            [f"images/event-{i}-1.jpg" for i in range(6)],
+        )
+
+    def test_event_list_marks_sold_out_events(self):
+        event = create_event("Sold out", maximum_attendees=1)
+        EventRegistration.objects.create(event=event, user=self.users[0])
+
+        response = self.client.get(reverse("events:event_list"))
+        [(listed_event, image)] = response.context["events"]
+        self.assertTrue(listed_event.is_sold_out())
+        self.assertIsNone(image)
+
+
+class SeatsTakenTest(TestCase):
+    def setUp(self):
+        self.event = create_event("Event", maximum_attendees=2)
+        self.users = [create_user(f"user{i}@ddsc.io") for i in range(3)]
+
+    def test_registrations_update_seats_taken(self):
+        first = EventRegistration.objects.create(event=self.event, user=self.users[0])
+        EventRegistration.objects.create(event=self.event, user=self.users[1])
+        self.event.refresh_from_db()
+        self.assertEqual(self.event.seats_taken, 2)
+        self.assertTrue(self.event.is_sold_out())
+
+        first.delete()
+        self.event.refresh_from_db()
+        self.assertEqual(self.event.seats_taken, 1)
+        self.assertTrue(self.event.has_available_tickets())
+
+    def test_registration_is_refused_when_sold_out(self):
+        for user in self.users[:2]:
+            EventRegistration.objects.create(event=self.event, user=user)
+
+        with self.assertRaises(EventSoldOutError):
+            EventRegistration.objects.create(event=self.event, user=self.users[2])
+        self.assertEqual(self.event.attendees.count(), 2)
+
+    def test_admin_reports_sold_out_event_as_form_error(self):
+        for user in self.users[:2]:
+            EventRegistration.objects.create(event=self.event, user=user)
+        admin = User.objects.create_superuser("admin@ddsc.io", "password")
+        self.client.force_login(admin)
+
+        response = self.client.post(
+            reverse("admin:events_eventregistration_add"),
+            {
+                "event": self.event.pk,
+                "user": self.users[2].pk,
+                "status": EventRegistration.StatusChoice.PENDING,
+            },
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(list(response.context["adminform"].form.errors), ["__all__"])
+        self.assertEqual(self.event.attendees.count(), 2)
+
+    def test_saving_stale_event_keeps_seats_taken(self):
+        stale_event = Event.objects.get(pk=self.event.pk)
+        EventRegistration.objects.create(event=self.event, user=self.users[0])
+
+        stale_event.save()
+        stale_event.refresh_from_db()
+        self.assertEqual(stale_event.seats_taken, 1)
+
+
+class TicketQRCodeTest(TestCase):
+    def setUp(self):
+        self.registration = EventRegistration.objects.create(
+            event=create_event("Event"), user=create_user("user@ddsc.io")
+        )
+
+    def test_qr_code_is_rendered_with_cache_headers(self):
+        response = self.client.get(self.registration.get_qr_code_url())
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], "image/png")
+        self.assertTrue(response.content.startswith(b"\x89PNG"))
+        self.assertIn("immutable", response["Cache-Control"])
+
+        response = self.client.get(
+            self.registration.get_qr_code_url(),
+            HTTP_IF_NONE_MATCH=response["ETag"],
+        )
+        self.assertEqual(response.status_code, 304)
+
+    def test_qr_code_requires_valid_signature(self):
+        url = reverse("events:ticket_qr_code", args=["tampered:data"])
+        self.assertEqual(self.client.get(url).status_code, 400)
+
+
+@override_settings(
+    DEFAULT_FILE_STORAGE="django.core.files.storage.FileSystemStorage",
+    MEDIA_ROOT=tempfile.mkdtemp(),
+)
+class TicketMailTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.event = create_event("Event")
+        buffer = BytesIO()
+        Image.new("RGB", (1850, 900)).save(buffer, format="JPEG")
+        EventImage.objects.create(
+            event=self.event,
+            image=SimpleUploadedFile("event.jpg", buffer.getvalue()),
+        )
+
+    def test_ticket_mail_embeds_images_from_memory(self):
+        users = [create_user(f"user{i}@ddsc.io") for i in range(2)]
+        with mock.patch(
+            "events.tasks.downscale_image", wraps=downscale_image
+        ) as downscale, mock.patch.object(
+            FileSystemStorage, "get_modified_time"
+        ) as get_modified_time:
+            for user in users:
+                registration = EventRegistration.objects.create(
+                    event=self.event, user=user
+                )
+                send_ticket_mail(user.id, registration.id)
+
+        self.assertEqual(downscale.call_count, 1)
+        get_modified_time.assert_not_called()
+        self.assertEqual(len(mail.outbox), 2)
+        content_ids = [image["Content-ID"] for image in mail.outbox[0].attachments]
+        self.assertEqual(content_ids, ["<ticket-qr-code>", "<event-image>"])
+
+        event_image = Image.open(
+            BytesIO(mail.outbox[1].attachments[1].get_payload(decode=True))
+        )
+        self.assertEqual(event_image.width, EVENT_EMAIL_IMAGE_WIDTH)
@@ -0,0 +1,38 @@
+from functools import lru_cache
+from io import BytesIO
+
+import qrcode
+import qrcode.image.svg
+from django.conf import settings
+
+QR_CODE_CONTENT_TYPES = {
+    "png": "image/png",
+    "svg": "image/svg+xml",
+}
+
+QR_CODE_IMAGE_FACTORIES = {
+    "png": None,
+    "svg": qrcode.image.svg.SvgPathImage,
+}
+
+
+@lru_cache(maxsize=1024)
+def render_ticket_qr_code(signed_ticket_data: str, image_format: str = "png") -> bytes:
+    """
+    Render the QR code pointing to the consume ticket endpoint.
+    The image only depends on the signed ticket data, so rendered images are kept
+    in a per process LRU cache.
+    """
+    qr = qrcode.QRCode(
+        version=1,
+        error_correction=qrcode.constants.ERROR_CORRECT_L,
+        box_size=10,
+        border=4,
+    )
+    qr.add_data(settings.CONSUME_TICKET_ENDPOINT + signed_ticket_data)
+    qr.make(fit=True)
+
+    buffer = BytesIO()
+    image_factory = QR_CODE_IMAGE_FACTORIES[image_format]
+    qr.make_image(image_factory=image_factory).save(buffer)
+    return buffer.getvalue()
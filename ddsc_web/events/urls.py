@@ -15,4 +15,16 @@ urlpatterns = [
     path("delete/<pk>/", views.DeleteEvent.as_view(), name="delete_event"),
     path("minimeetup/", views.MiniMeetupView.as_view(), name="mini_meetup"),
     path("consume/<token>/", views.consume_ticket, name="consume_ticket"),
+    path(
+        "ticket/<token>/qr.png",
+        views.ticket_qr_code,
+        {"image_format": "png"},
+        name="ticket_qr_code",
+    ),
+    path(
+        "ticket/<token>/qr.svg",
+        views.ticket_qr_code,
+        {"image_format": "svg"},
+        name="ticket_qr_code_svg",
+    ),
 ]
@@ -1,14 +1,19 @@
+import hashlib
+
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required, user_passes_test
 from django.contrib.auth.mixins import LoginRequiredMixin, PermissionRequiredMixin
 from django.core.signing import BadSignature
 from django.db import IntegrityError, transaction
-from django.http import HttpResponseBadRequest, HttpResponseRedirect
+from django.http import HttpResponse, HttpResponseBadRequest, HttpResponseRedirect
 from django.shortcuts import get_object_or_404, redirect, render
 from django.urls import reverse
 from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import quote_etag
 from django.utils.translation import gettext_lazy as _
 from django.views import View
+from django.views.decorators.http import require_safe
 from django.views.generic.base import TemplateView
 from django.views.generic.edit import DeleteView
 from users.models import User
@@ -16,9 +21,12 @@ from users.models import User
 from .decorators import login_required_with_next, redirect_when_sold_out
 from .forms import CreateEventForm, EventAddressForm, EventImageForm, RegisterEventForm
 from .mixins import SaveEventMixin
-from .models import Event, EventRegistration
+from .models import Event, EventRegistration, EventSoldOutError
 from .signing import unsign_ticket_data
 from .tasks import send_ticket_mail
+from .tickets import QR_CODE_CONTENT_TYPES, render_ticket_qr_code
+
+TICKET_QR_CODE_MAX_AGE = 60 * 60 * 24 * 365
 
 
 def event_list(request):
@@ -26,7 +34,8 @@ def event_list(request):
         events = Event.coming_events.all()
     else:
         events = Event.coming_events.filter(draft=False)
-    events_dict = {event: event.images.first() for event in events}
+    events = events.with_listing_data()
+    events_dict = {event: event.get_first_image() for event in events}
 
     if not events:
         return render(
@@ -42,7 +51,7 @@ def event_list(request):
             "events/list.html",
             {
                 "events_active": "active",
-                "has_events": events.exists(),
+                "has_events": bool(events_dict),
                 "events": events_dict.items(),
             },
         )
@@ -79,7 +88,7 @@ class RegisterEvent(View):
     def setup(self, request, id, slug, *args, **kwargs):
         """
         Override setup method to initialize view by getting the event object.
-        Then check if event is sold out and if user is authenticated. Redirect if necessary
+        Sold out and authentication checks are done by the method decorators.
         """
         super().setup(request, *args, **kwargs)
         self.event = get_object_or_404(
@@ -88,8 +97,6 @@ class RegisterEvent(View):
             slug=slug,
             end_datetime__gt=timezone.now(),
         )
-        if self.event.is_sold_out():
-            return HttpResponseRedirect(reverse("events:event_list"))
 
     @login_required_with_next
     @redirect_when_sold_out
@@ -128,7 +135,9 @@ class RegisterEvent(View):
 
         if self.form.is_valid():
             event_registration = self.__create_event_registration()
-            self.__try_save_or_error(event_registration)
+            error_response = self.__try_save_or_error(event_registration)
+            if error_response:
+                return error_response
             send_ticket_mail.delay(request.user.id, event_registration.id)
             return redirect("users:dashboard")
         else:
@@ -141,12 +150,21 @@ class RegisterEvent(View):
         )
 
     def __try_save_or_error(self, event_registration):
+        """
+        Save the registration. Returns a redirect if the event sold out while
+        the user was signing up or the user is already registered.
+        """
         try:
             event_registration.save()
-            return redirect("users:dashboard")
+        except EventSoldOutError:
+            messages.error(
+                self.request, _("Der er desværre ikke flere pladser til eventet")
+            )
+            return HttpResponseRedirect(reverse("events:event_list"))
         except IntegrityError as e:
             if "UNIQUE constraint" in str(e.args):
                 messages.error(self.request, _("Du er allerede tilmeldt dette event"))
+            return redirect("users:dashboard")
 
     def __generic_error_message(self):
         return messages.error(self.request, _("Noget gik galt"))
@@ -309,3 +327,29 @@ def consume_ticket(request, token):
                 "event_registration": event_registration,
             },
         )
+
+
+@require_safe
+def ticket_qr_code(request, token, image_format):
+    """
+    Render the ticket QR code from the signed ticket data in the url.
+    The image never changes for a given token, so it is served with a strong ETag
+    and a long lived cache header.
+    """
+    try:
+        unsign_ticket_data(token)
+    except BadSignature:
+        return HttpResponseBadRequest("Bad signature")
+
+    content = render_ticket_qr_code(token, image_format)
+    etag = quote_etag(hashlib.md5(content).hexdigest())
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = HttpResponse(
+            content, content_type=QR_CODE_CONTENT_TYPES[image_format]
+        )
+    response["ETag"] = etag
+    patch_cache_control(
+        response, private=True, max_age=TICKET_QR_CODE_MAX_AGE, immutable=True
+    )
+    return response
@@ -6,6 +6,7 @@ from django.contrib.auth import get_user_model
 from django.template.loader import render_to_string
 from django.utils.translation import gettext_lazy as _
 from shared.emails import create_email_with_images
+from shared.tasks import send_or_queue_email
 from django.conf import settings
 
 User = get_user_model()
@@ -34,4 +35,4 @@ def send_welcome_email(user_id):
         recipient=user.email,
         image_paths=[Path(settings.STATICFILES_DIRS[0]) / "ddsc-logo-base.png"],
     )
-    email.send()
+    send_or_queue_email(email)
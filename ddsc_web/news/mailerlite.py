@@ -1,98 +1,140 @@
 import requests
 import time
 
+from functools import lru_cache
 from typing import Callable
-from functools import partial
-
-
-def get_newsletter_subscriber_id(
-    email: str,
-    api_url: str,
-    api_key: str,
-) -> int | None:
-    url = f"{get_subscribers_endpoint(api_url)}/{email}"
-    headers = get_auth_header(api_key)
-    response = requests.get(url, headers=headers)
-
-    if response.status_code == 200:
-        subscriber_data = response.json()
-        return subscriber_data["data"].get("id")
-    elif response.status_code == 404:
-        return None
-    else:
-        response.raise_for_status()
-
-
-def forget_newsletter_subscriber(
-    subscriber_id: int,
-    api_url: str,
-    api_key: str,
-) -> bool:
-    """GDPR compliant endpoint to delete a subscriber entirely after 30 days."""
-    url = url = f"{get_subscribers_endpoint(api_url)}/{subscriber_id}/forget"
-    headers = get_auth_header(api_key)
-    response = requests.post(url, headers=headers)
-
-    if response.status_code == 200:
-        return True
-    elif response.status_code == 404:
-        return False
-    else:
-        response.raise_for_status()
-
-
-def get_subscribers_list(
-    api_url: str,
-    api_key: str,
-    limit=25,
-) -> list[dict[str, str]]:
-    url = get_subscribers_endpoint(api_url)
-    params = {"filter[status]": "active", "limit": limit}
-    headers = get_auth_header(api_key)
-
-    subscribers = []
-    cursor = None
-
-    while True:
-        if cursor:
-            params["cursor"] = cursor
-
-        response = requests.get(url, headers=headers, params=params)
-        if response.status_code != 200:
+
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+
+# (connect, read) timeouts in seconds
+DEFAULT_TIMEOUT = (3.05, 10)
+
+# Maximum number of requests in one call to the batch endpoint
+MAX_BATCH_SIZE = 50
+
+# Maximum number of subscribers in one page of the subscribers endpoint
+MAX_PAGE_SIZE = 1000
+
+
+class MailerLiteClient:
+    """
+    Client for the MailerLite API. Requests go through one pooled keep-alive
+    session, so consecutive calls reuse the TCP and TLS connection.
+    """
+
+    def __init__(
+        self,
+        api_url: str,
+        api_key: str,
+        pool_size: int = 10,
+        timeout: tuple[float, float] = DEFAULT_TIMEOUT,
+    ):
+        self.api_url = api_url
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.session.headers.update(get_auth_header(api_key))
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def request(self, method: str, url: str, **kwargs) -> requests.Response:
+        kwargs.setdefault("timeout", self.timeout)
+        return self.session.request(method, url, **kwargs)
+
+    def get_newsletter_subscriber_id(self, email: str) -> int | None:
+        url = f"{get_subscribers_endpoint(self.api_url)}/{email}"
+        response = self.request("GET", url)
+
+        if response.status_code == 200:
+            subscriber_data = response.json()
+            return subscriber_data["data"].get("id")
+        elif response.status_code == 404:
+            return None
+        else:
             response.raise_for_status()
 
-        data = response.json()
-        for subscriber in data["data"]:
-            subscribers.append({"email": subscriber["email"], "id": subscriber["id"]})
+    def forget_newsletter_subscriber(self, subscriber_id: int) -> bool:
+        """GDPR compliant endpoint to delete a subscriber entirely after 30 days."""
+        url = f"{get_subscribers_endpoint(self.api_url)}/{subscriber_id}/forget"
+        response = self.request("POST", url)
 
-        cursor = data.get("meta", {}).get("next_cursor")
-        if not cursor:
-            break
+        if response.status_code == 200:
+            return True
+        elif response.status_code == 404:
+            return False
+        else:
+            response.raise_for_status()
 
-    return subscribers
+    def get_subscribers_list(self, limit=MAX_PAGE_SIZE) -> list[dict[str, str]]:
+        url = get_subscribers_endpoint(self.api_url)
+        params = {"filter[status]": "active", "limit": limit}
 
+        subscribers = []
+        cursor = None
 
-def subscribe_to_newsletter(
-    email: str,
-    name: str,
-    api_url: str,
-    api_key: str,
-) -> requests.Response:
-    url = get_subscribers_endpoint(api_url)
-    headers = get_auth_header(api_key)
-    payload = get_subscribe_payload(email, name)
-    lazy_request = partial(requests.post, url=url, json=payload, headers=headers)
-    response = lazy_request()
-    if response.status_code == 429:
-        response = retry_delayed(lazy_request, response)
+        while True:
+            if cursor:
+                params["cursor"] = cursor
+
+            response = self.request("GET", url, params=params)
+            if response.status_code != 200:
+                response.raise_for_status()
+
+            data = response.json()
+            for subscriber in data["data"]:
+                subscribers.append(
+                    {"email": subscriber["email"], "id": subscriber["id"]}
+                )
+
+            cursor = data.get("meta", {}).get("next_cursor")
+            if not cursor:
+                break
+
+        return subscribers
+
+    def subscribe_to_newsletter(self, email: str, name: str) -> requests.Response:
+        url = get_subscribers_endpoint(self.api_url)
+        payload = get_subscribe_payload(email, name)
+        return self.request("POST", url, json=payload)
+
+    def batch(self, batch_requests: list[dict]) -> requests.Response:
+        """
+        Send up to MAX_BATCH_SIZE API requests in one call. The response body holds
+        a 'responses' list with the status code and body of each request in order.
+        """
+        if len(batch_requests) > MAX_BATCH_SIZE:
+            raise ValueError(f"A batch can hold at most {MAX_BATCH_SIZE} requests")
+        url = get_batch_endpoint(self.api_url)
+        return self.request("POST", url, json={"requests": batch_requests})
 
-    return response
+
+@lru_cache(maxsize=None)
+def get_mailerlite_client() -> MailerLiteClient:
+    """One client per process. Created lazily, so celery workers create it after forking."""
+    return MailerLiteClient(
+        api_url=settings.MAILERLITE_API_URL,
+        api_key=settings.MAILERLITE_API_KEY,
+        pool_size=settings.MAILERLITE_POOL_SIZE,
+    )
 
 
 def get_subscribers_endpoint(api_url: str) -> str:
     return f"{api_url}/subscribers"
 
 
+def get_batch_endpoint(api_url: str) -> str:
+    return f"{api_url}/batch"
+
+
+def get_subscribe_batch_request(email: str, name: str) -> dict:
+    return {
+        "method": "POST",
+        "path": "api/subscribers",
+        "body": get_subscribe_payload(email, name),
+    }
+
+
 def get_subscribe_payload(email: str, name: str) -> dict[str, str | int]:
     return {
         "email": email,
@@ -108,10 +150,14 @@ def get_auth_header(api_key: str) -> dict[str, str]:
     }
 
 
+def get_retry_after(ratelimit_response: requests.Response) -> int:
+    return int(ratelimit_response.headers.get("Retry-After", 1))
+
+
 def retry_delayed(
     lazy_request: Callable,
     ratelimit_response: requests.Response,
 ) -> requests.Response:
-    retry_after = int(ratelimit_response.headers.get("Retry-After", 1))
-    time.sleep(retry_after)
+    """Blocking retry, only for use outside of celery workers."""
+    time.sleep(get_retry_after(ratelimit_response))
     return lazy_request()
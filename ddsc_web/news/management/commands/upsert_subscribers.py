@@ -1,24 +1,43 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+import requests
 from django.core.management.base import BaseCommand
-from django.conf import settings
+from django.utils import timezone
 
 from news.mailerlite import (
-    subscribe_to_newsletter,
-    get_subscribers_list,
-    forget_newsletter_subscriber,
+    MAX_BATCH_SIZE,
+    get_mailerlite_client,
+    get_subscribe_batch_request,
+    retry_delayed,
+)
+from news.models import NewsletterSync, NewsSubscriber
+
+SUBSCRIBER_FIELDS = (
+    "allow_newsletters",
+    "user__email",
+    "user__first_name",
+    "user__last_name",
 )
-from news.models import NewsSubscriber
 
 
-MAILERLITE_API_URL = settings.MAILERLITE_API_URL
-MAILERLITE_API_KEY = settings.MAILERLITE_API_KEY
+def to_mailer_entry(subscriber: dict) -> dict[str, str]:
+    name = f"{subscriber['user__first_name']} {subscriber['user__last_name']}"
+    return {"email": subscriber["user__email"], "name": name.strip()}
 
 
 def get_local_subscribers():
-    subscribers = NewsSubscriber.get_mailing_list()
-    return [
-        {"email": subscriber.user.email, "name": subscriber.user.get_full_name()}
-        for subscriber in subscribers
-    ]
+    subscribers = NewsSubscriber.get_mailing_list().filter(user__isnull=False)
+    return [to_mailer_entry(s) for s in subscribers.values(*SUBSCRIBER_FIELDS)]
+
+
+def get_changed_subscribers(since) -> list[dict]:
+    """Subscribers changed after the watermark, or all of them without one."""
+    subscribers = NewsSubscriber.objects.filter(user__isnull=False)
+    if since is not None:
+        subscribers = subscribers.filter(updated__gt=since)
+    return list(subscribers.values(*SUBSCRIBER_FIELDS))
 
 
 def get_new_subscribers_list(
@@ -37,15 +56,79 @@ def get_unsubscribed_list(
     return [entry for entry in remote_mailer_list if entry["email"] not in local_emails]
 
 
+def chunked(items: list, size: int):
+    for start in range(0, len(items), size):
+        yield items[start : start + size]
+
+
 class Command(BaseCommand):
     help = "Synchronize newsletter subscribers with MailerLite"
 
-    def handle(self, *args, **kwargs):
-        local_subscribers = get_local_subscribers()
-        mailerlite_subscribers = get_subscribers_list(
-            api_url=MAILERLITE_API_URL,
-            api_key=MAILERLITE_API_KEY,
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--incremental",
+            action="store_true",
+            help=(
+                "Only push subscribers changed since the last successful sync, "
+                "without crawling the MailerLite audience"
+            ),
+        )
+        parser.add_argument(
+            "--batch",
+            action="store_true",
+            help=(
+                "Upsert subscribers with MailerLite batch requests and delete "
+                "unsubscribers concurrently"
+            ),
+        )
+        parser.add_argument(
+            "--concurrency",
+            type=int,
+            default=4,
+            help="Number of concurrent deletions in batch mode",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Only report the changes, nothing is sent to MailerLite",
         )
+
+    def handle(self, *args, **options):
+        self.client = get_mailerlite_client()
+        sync_started = timezone.now()
+        if options["incremental"]:
+            mode = NewsletterSync.ModeChoice.INCREMENTAL
+            new_subscribers, unsubscribed = self.__get_incremental_changes()
+        else:
+            mode = NewsletterSync.ModeChoice.AUDIT
+            new_subscribers, unsubscribed = self.__get_audit_changes()
+
+        if options["dry_run"]:
+            self.__report_dry_run(new_subscribers, unsubscribed)
+            return
+
+        if options["batch"]:
+            failures = self.__batch_upsert_subscribers(new_subscribers)
+            failures += self.__concurrent_delete_subscribers(
+                unsubscribed, options["concurrency"]
+            )
+        else:
+            failures = self.__upsert_subscribers(new_subscribers)
+            failures += self.__delete_subscribers(unsubscribed)
+
+        if failures:
+            self.stdout.write(
+                self.style.WARNING(
+                    f"{failures} changes failed, the sync watermark was not advanced."
+                )
+            )
+        else:
+            NewsletterSync.objects.create(mode=mode, synced_until=sync_started)
+
+    def __get_audit_changes(self):
+        """Diff the full local list against a crawl of the MailerLite audience."""
+        local_subscribers = get_local_subscribers()
+        mailerlite_subscribers = self.client.get_subscribers_list()
         new_subscribers = get_new_subscribers_list(
             local_mailer_list=local_subscribers,
             remote_mailer_list=mailerlite_subscribers,
@@ -54,19 +137,50 @@ class Command(BaseCommand):
             local_mailer_list=local_subscribers,
             remote_mailer_list=mailerlite_subscribers,
         )
-        self.__upsert_subscribers(new_subscribers)
-        self.__delete_subscribers(unsubscribed)
+        return new_subscribers, unsubscribed
 
-    def __upsert_subscribers(self, new_subscribers: list[dict[str, str]]):
+    def __get_incremental_changes(self):
+        """
+        Subscribers changed since the last successful sync. Deleted users are not
+        seen here, they are caught by the next audit.
+        """
+        new_subscribers = []
+        unsubscribed = []
+        for subscriber in get_changed_subscribers(NewsletterSync.get_watermark()):
+            entry = to_mailer_entry(subscriber)
+            if subscriber["allow_newsletters"]:
+                new_subscribers.append(entry)
+                continue
+            subscriber_id = self.client.get_newsletter_subscriber_id(entry["email"])
+            if subscriber_id is not None:
+                unsubscribed.append({"email": entry["email"], "id": subscriber_id})
+        return new_subscribers, unsubscribed
+
+    def __report_dry_run(
+        self,
+        new_subscribers: list[dict[str, str]],
+        unsubscribers: list[dict[str, str | int]],
+    ):
+        for subscriber in new_subscribers:
+            self.stdout.write(f"Would subscribe '{subscriber['email']}'")
+        for unsubscriber in unsubscribers:
+            self.stdout.write(f"Would unsubscribe '{unsubscriber['email']}'")
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Dry run: {len(new_subscribers)} to subscribe, "
+                f"{len(unsubscribers)} to unsubscribe."
+            )
+        )
+
+    def __upsert_subscribers(self, new_subscribers: list[dict[str, str]]) -> int:
+        failures = 0
         for subscriber in new_subscribers:
             email = subscriber["email"]
             name = subscriber["name"]
-            response = subscribe_to_newsletter(
-                email,
-                name,
-                api_key=MAILERLITE_API_KEY,
-                api_url=MAILERLITE_API_URL,
-            )
+            lazy_request = partial(self.client.subscribe_to_newsletter, email, name)
+            response = lazy_request()
+            if response.status_code == 429:
+                response = retry_delayed(lazy_request, response)
             if response.status_code == 200:
                 self.stdout.write(
                     self.style.WARNING(f"Email '{email}' has allready subscribed.")
@@ -76,26 +190,103 @@ class Command(BaseCommand):
                     self.style.SUCCESS(f"Email '{email}' was subscribed succesfully.")
                 )
             else:
+                failures += 1
                 self.stdout.write(
                     self.style.ERROR(f"Failed to subscribe {email}: {response.content}")
                 )
+        return failures
 
-    def __delete_subscribers(self, unsubscribers: list[dict[str, str | int]]):
+    def __delete_subscribers(self, unsubscribers: list[dict[str, str | int]]) -> int:
+        failures = 0
         for unsubscriber in unsubscribers:
-            success = forget_newsletter_subscriber(
-                subscriber_id=unsubscriber["id"],
-                api_url=MAILERLITE_API_URL,
-                api_key=MAILERLITE_API_KEY,
-            )
+            success = self.client.forget_newsletter_subscriber(unsubscriber["id"])
             if not success:
+                failures += 1
                 self.stdout.write(
                     self.style.ERROR(
                         f"Failed to unsubscribe email: '{unsubscriber['email']}'."
                     )
                 )
+            else:
+                self.stdout.write(
+                    self.style.SUCCESS(
+                        f"Email '{unsubscriber['email']}' was unsubscribed succesfully."
+                    )
+                )
+        return failures
 
-            self.stdout.write(
-                self.style.SUCCESS(
-                    f"Email '{unsubscriber['email']}' was unsubscribed succesfully."
+    def __batch_upsert_subscribers(self, new_subscribers: list[dict[str, str]]) -> int:
+        started = time.monotonic()
+        errors = []
+        for chunk in chunked(new_subscribers, MAX_BATCH_SIZE):
+            batch_requests = [
+                get_subscribe_batch_request(subscriber["email"], subscriber["name"])
+                for subscriber in chunk
+            ]
+            lazy_request = partial(self.client.batch, batch_requests)
+            response = lazy_request()
+            if response.status_code == 429:
+                response = retry_delayed(lazy_request, response)
+            if response.status_code != 200:
+                errors.extend(
+                    (subscriber["email"], response.content) for subscriber in chunk
                 )
+                continue
+
+            responses = response.json()["responses"]
+            for subscriber, result in zip(chunk, responses):
+                if result["code"] not in (200, 201):
+                    errors.append((subscriber["email"], result.get("body")))
+
+        self.__write_summary("Subscribed", len(new_subscribers), errors, started)
+        return len(errors)
+
+    def __concurrent_delete_subscribers(
+        self,
+        unsubscribers: list[dict[str, str | int]],
+        concurrency: int,
+    ) -> int:
+        started = time.monotonic()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            results = executor.map(self.__forget_subscriber, unsubscribers)
+            errors = [
+                (unsubscriber["email"], error)
+                for unsubscriber, error in zip(unsubscribers, results)
+                if error
+            ]
+        self.__write_summary("Unsubscribed", len(unsubscribers), errors, started)
+        return len(errors)
+
+    def __forget_subscriber(self, unsubscriber: dict[str, str | int]) -> str | None:
+        """Returns an error message if the subscriber could not be forgotten."""
+        lazy_request = partial(
+            self.client.forget_newsletter_subscriber, unsubscriber["id"]
+        )
+        try:
+            try:
+                found = lazy_request()
+            except requests.HTTPError as e:
+                if e.response is None or e.response.status_code != 429:
+                    raise
+                found = retry_delayed(lazy_request, e.response)
+        except requests.RequestException as e:
+            return str(e)
+        return None if found else "Subscriber was not found"
+
+    def __write_summary(
+        self,
+        action: str,
+        total: int,
+        errors: list[tuple],
+        started: float,
+    ):
+        elapsed = time.monotonic() - started
+        throughput = total / elapsed if elapsed else total
+        for email, error in errors:
+            self.stdout.write(self.style.ERROR(f"Failed for '{email}': {error}"))
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{action} {total - len(errors)} of {total} in {elapsed:.1f}s "
+                f"({throughput:.1f}/s), {len(errors)} errors."
             )
+        )
@@ -0,0 +1,41 @@
+# Generated by Django 4.1.5 on 2026-10-18 12:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("news", "0003_auto_20220323_2017"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="NewsletterSync",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "mode",
+                    models.CharField(
+                        choices=[("incremental", "Incremental"), ("audit", "Audit")],
+                        max_length=20,
+                    ),
+                ),
+                ("synced_until", models.DateTimeField()),
+                ("created", models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name="newssubscriber",
+            name="updated",
+            field=models.DateTimeField(auto_now=True, db_index=True),
+        ),
+    ]
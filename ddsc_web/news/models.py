@@ -12,6 +12,7 @@ class NewsSubscriber(models.Model):
         null=True,
     )
     created = models.DateTimeField(auto_now_add=True)
+    updated = models.DateTimeField(auto_now=True, db_index=True)
     allow_newsletters = models.BooleanField(default=True)
 
     @property
@@ -21,3 +22,21 @@ class NewsSubscriber(models.Model):
     @classmethod
     def get_mailing_list(self):
         return self.objects.filter(allow_newsletters=True)
+
+
+class NewsletterSync(models.Model):
+    """A successful synchronization with MailerLite."""
+
+    class ModeChoice(models.TextChoices):
+        INCREMENTAL = "incremental", "Incremental"
+        AUDIT = "audit", "Audit"
+
+    mode = models.CharField(max_length=20, choices=ModeChoice.choices)
+    # subscribers changed after this point in time are not yet synchronized
+    synced_until = models.DateTimeField()
+    created = models.DateTimeField(auto_now_add=True)
+
+    @classmethod
+    def get_watermark(cls):
+        last_sync = cls.objects.order_by("-synced_until").first()
+        return last_sync.synced_until if last_sync else None
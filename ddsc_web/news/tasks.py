@@ -1,53 +1,99 @@
 from __future__ import absolute_import, unicode_literals
+import random
+
+import requests
 from celery.utils.log import get_task_logger
 from django.utils.translation import gettext_lazy as _
 from django.conf import settings
 from ddsc_web.celery import celery_app
-from .mailerlite import (
-    get_newsletter_subscriber_id,
-    forget_newsletter_subscriber,
-    subscribe_to_newsletter,
-)
+from .mailerlite import get_mailerlite_client, get_retry_after
+
+# The MailerLite quota is shared by both tasks. Upserts get half of it, deletes
+# get the other half but make two requests each.
+UPSERT_RATE_LIMIT = f"{settings.MAILERLITE_REQUESTS_PER_MINUTE // 2}/m"
+DELETE_RATE_LIMIT = f"{settings.MAILERLITE_REQUESTS_PER_MINUTE // 4}/m"
+
 
-MAILERLITE_API_URL = settings.MAILERLITE_API_URL
-MAILERLITE_API_KEY = settings.MAILERLITE_API_KEY
+class MailerLiteServerError(Exception):
+    """A 5xx response from MailerLite, which is worth retrying."""
+
+
+MAILERLITE_RETRY_OPTIONS = {
+    "bind": True,
+    # never permanent client errors like an invalid email or API key, they would
+    # just burn the quota
+    "autoretry_for": (
+        requests.ConnectionError,
+        requests.Timeout,
+        MailerLiteServerError,
+    ),
+    "retry_backoff": True,
+    "retry_backoff_max": 60 * 10,
+    "retry_jitter": True,
+    "max_retries": 8,
+}
 
 
 logger = get_task_logger(__name__)
 
 
-@celery_app.task(name="delete_mailerlite_subscriber")
-def delete_mailerlite_subscriber(email: str):
-    subscriber_id = get_newsletter_subscriber_id(
-        email,
-        api_url=MAILERLITE_API_URL,
-        api_key=MAILERLITE_API_KEY,
-    )
-    success = forget_newsletter_subscriber(
-        subscriber_id,
-        api_url=MAILERLITE_API_URL,
-        api_key=MAILERLITE_API_KEY,
+def retry_when_rate_limited(task, response: requests.Response | None):
+    """
+    Reschedule the task after MailerLite's Retry-After instead of sleeping,
+    so the worker process is free to run other tasks in the meantime.
+    """
+    if response is not None and response.status_code == 429:
+        countdown = get_retry_after(response) + random.uniform(0, 5)
+        raise task.retry(countdown=countdown)
+
+
+def handle_error_response(task, response: requests.Response):
+    """
+    Retry rate limited requests and server errors, log and drop the request on
+    any other error response.
+    """
+    retry_when_rate_limited(task, response)
+    if response.status_code >= 500:
+        raise MailerLiteServerError(f"MailerLite responded {response.status_code}")
+    logger.error(
+        f"MailerLite rejected {task.name} with {response.status_code}: "
+        f"{response.text}"
     )
+
+
+@celery_app.task(
+    name="delete_mailerlite_subscriber",
+    rate_limit=DELETE_RATE_LIMIT,
+    **MAILERLITE_RETRY_OPTIONS,
+)
+def delete_mailerlite_subscriber(self, email: str):
+    client = get_mailerlite_client()
+    try:
+        subscriber_id = client.get_newsletter_subscriber_id(email)
+        success = client.forget_newsletter_subscriber(subscriber_id)
+    except requests.HTTPError as e:
+        handle_error_response(self, e.response)
+        return
     if success:
         logger.info(f"Subscriber was succesfully deleted")
     else:
         logger.error(f"Subscriber was not found")
 
 
-@celery_app.task(name="upsert_mailerlite_subscriber")
+@celery_app.task(
+    name="upsert_mailerlite_subscriber",
+    rate_limit=UPSERT_RATE_LIMIT,
+    **MAILERLITE_RETRY_OPTIONS,
+)
 def upsert_mailerlite_subscriber(
+    self,
     email: str,
     name: str,
 ):
-    response = subscribe_to_newsletter(
-        email,
-        name,
-        api_url=MAILERLITE_API_URL,
-        api_key=MAILERLITE_API_KEY,
-    )
+    response = get_mailerlite_client().subscribe_to_newsletter(email, name)
     if response.status_code == 200:
         logger.info(f"Email '{email}' has previously subscribed.")
     elif response.status_code == 201:
         logger.info(f"Email '{email}' was subscribed succesfully.")
     else:
-        response.raise_for_status()
+        handle_error_response(self, response)
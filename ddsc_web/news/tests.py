@@ -1,3 +1,217 @@
-from django.test import TestCase
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+import requests
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase
+
+from . import tasks
+from .mailerlite import MAX_BATCH_SIZE, MailerLiteClient, get_subscribe_batch_request
+from .models import NewsletterSync, NewsSubscriber
+from users.models import User
+
+
+def mailerlite_response(status_code: int, headers: dict | None = None):
+    response = requests.Response()
+    response.status_code = status_code
+    response.headers.update(headers or {})
+    return response
+
+
+class StubMailerLiteHandler(BaseHTTPRequestHandler):
+    """Minimal stand-in for the MailerLite subscribers API."""
+
+    protocol_version = "HTTP/1.1"
+
+    def setup(self):
+        super().setup()
+        self.server.connections += 1
+
+    def do_GET(self):
+        self.server.authorizations.append(self.headers["Authorization"])
+        if self.path.startswith("/api/subscribers/known@ddsc.io"):
+            self.send_json(200, {"data": {"id": 1}})
+        elif self.path.startswith("/api/subscribers?"):
+            cursor = "cursor=next" in self.path
+            self.send_json(
+                200,
+                {
+                    "data": [{"email": f"page{int(cursor)}@ddsc.io", "id": 1}],
+                    "meta": {"next_cursor": None if cursor else "next"},
+                },
+            )
+        else:
+            self.send_json(404, {})
+
+    def do_POST(self):
+        self.server.authorizations.append(self.headers["Authorization"])
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        if self.path == "/api/batch":
+            batch_requests = json.loads(body)["requests"]
+            self.server.batches.append(batch_requests)
+            responses = [{"code": 201, "body": {}} for _ in batch_requests]
+            self.send_json(200, {"responses": responses})
+        elif self.path.endswith("/forget"):
+            self.server.forgotten.append(self.path.split("/")[-2])
+            self.send_json(200, {})
+        else:
+            self.send_json(201, {"data": {"id": 2}})
+
+    def send_json(self, status_code: int, data: dict):
+        body = json.dumps(data).encode()
+        self.send_response(status_code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class StubMailerLiteMixin:
+    def setUp(self):
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), StubMailerLiteHandler)
+        self.server.connections = 0
+        self.server.authorizations = []
+        self.server.batches = []
+        self.server.forgotten = []
+        thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        thread.start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        self.client = MailerLiteClient(
+            api_url=f"http://127.0.0.1:{self.server.server_port}/api",
+            api_key="secret",
+        )
+        self.addCleanup(self.client.session.close)
+
+
+class MailerLiteClientTest(StubMailerLiteMixin, SimpleTestCase):
+    def test_requests_reuse_one_connection(self):
+        self.assertEqual(self.client.get_newsletter_subscriber_id("known@ddsc.io"), 1)
+        self.assertIsNone(self.client.get_newsletter_subscriber_id("new@ddsc.io"))
+        self.assertEqual(
+            self.client.subscribe_to_newsletter("new@ddsc.io", "New").status_code, 201
+        )
+        self.assertEqual(
+            [s["email"] for s in self.client.get_subscribers_list()],
+            ["page0@ddsc.io", "page1@ddsc.io"],
+        )
+
+        self.assertEqual(self.server.connections, 1)
+        self.assertEqual(set(self.server.authorizations), {"Bearer secret"})
+
+    def test_batch_is_limited_to_max_batch_size(self):
+        batch_requests = [
+            get_subscribe_batch_request(f"user{i}@ddsc.io", "User")
+            for i in range(MAX_BATCH_SIZE + 1)
+        ]
+        with self.assertRaises(ValueError):
+            self.client.batch(batch_requests)
+
+
+class UpsertSubscribersCommandTest(StubMailerLiteMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        users = User.objects.bulk_create(
+            User(email=f"user{i}@ddsc.io") for i in range(MAX_BATCH_SIZE + 1)
+        )
+        NewsSubscriber.objects.bulk_create(NewsSubscriber(user=user) for user in users)
+        patcher = mock.patch(
+            "news.management.commands.upsert_subscribers.get_mailerlite_client",
+            return_value=self.client,
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_batch_mode_groups_upserts_and_deletes_concurrently(self):
+        out = StringIO()
+        call_command("upsert_subscribers", "--batch", "--concurrency=2", stdout=out)
+
+        self.assertEqual(
+            [len(batch) for batch in self.server.batches], [MAX_BATCH_SIZE, 1]
+        )
+        self.assertEqual(self.server.forgotten, ["1", "1"])
+        self.assertIn(
+            f"Subscribed {MAX_BATCH_SIZE + 1} of {MAX_BATCH_SIZE + 1}", out.getvalue()
+        )
+        self.assertIn("Unsubscribed 2 of 2", out.getvalue())
+
+    def test_dry_run_sends_nothing(self):
+        out = StringIO()
+        call_command("upsert_subscribers", "--batch", "--dry-run", stdout=out)
+
+        self.assertEqual(self.server.batches, [])
+        self.assertEqual(self.server.forgotten, [])
+        self.assertIn(
+            f"{MAX_BATCH_SIZE + 1} to subscribe, 2 to unsubscribe", out.getvalue()
+        )
+
+    def test_incremental_sync_only_pushes_changes_since_watermark(self):
+        call_command("upsert_subscribers", "--batch", stdout=StringIO())
+        self.assertEqual(NewsletterSync.objects.count(), 1)
+        self.server.batches.clear()
+        self.server.forgotten.clear()
+
+        with mock.patch("news.signals.upsert_mailerlite_subscriber"), mock.patch(
+            "news.signals.delete_mailerlite_subscriber"
+        ):
+            new_user = User.objects.create(email="new@ddsc.io")
+            NewsSubscriber.objects.create(user=new_user)
+            known_user = User.objects.create(email="known@ddsc.io")
+            NewsSubscriber.objects.create(user=known_user, allow_newsletters=False)
+        with mock.patch.object(self.client, "get_subscribers_list") as crawl:
+            call_command(
+                "upsert_subscribers", "--incremental", "--batch", stdout=StringIO()
+            )
+
+        crawl.assert_not_called()
+        [batch] = self.server.batches
+        self.assertEqual([r["body"]["email"] for r in batch], ["new@ddsc.io"])
+        self.assertEqual(self.server.forgotten, ["1"])
+        last_sync = NewsletterSync.objects.order_by("-synced_until").first()
+        self.assertEqual(last_sync.mode, NewsletterSync.ModeChoice.INCREMENTAL)
+
+
+@mock.patch.object(MailerLiteClient, "subscribe_to_newsletter")
+class MailerLiteTaskTest(SimpleTestCase):
+    def test_rate_limited_upsert_is_retried_without_sleeping(self, subscribe):
+        subscribe.side_effect = [
+            mailerlite_response(429, {"Retry-After": "30"}),
+            mailerlite_response(201),
+        ]
+        with mock.patch("time.sleep") as sleep:
+            result = tasks.upsert_mailerlite_subscriber.apply(
+                args=["user@ddsc.io", "User"]
+            )
+
+        self.assertTrue(result.successful())
+        self.assertEqual(subscribe.call_count, 2)
+        sleep.assert_not_called()
+
+    def test_server_errors_are_retried(self, subscribe):
+        subscribe.side_effect = [mailerlite_response(503), mailerlite_response(200)]
+        result = tasks.upsert_mailerlite_subscriber.apply(args=["user@ddsc.io", "User"])
+
+        self.assertTrue(result.successful())
+        self.assertEqual(subscribe.call_count, 2)
+
+    def test_connection_errors_are_retried(self, subscribe):
+        subscribe.side_effect = [requests.ConnectionError(), mailerlite_response(201)]
+        result = tasks.upsert_mailerlite_subscriber.apply(args=["user@ddsc.io", "User"])
+
+        self.assertTrue(result.successful())
+        self.assertEqual(subscribe.call_count, 2)
+
+    def test_client_errors_are_logged_and_dropped(self, subscribe):
+        subscribe.return_value = mailerlite_response(422)
+        with self.assertLogs(tasks.logger, "ERROR") as logs:
+            result = tasks.upsert_mailerlite_subscriber.apply(args=["invalid", "User"])
+
+        self.assertTrue(result.successful())
+        self.assertEqual(subscribe.call_count, 1)
+        self.assertIn("422", logs.output[0])
@@ -0,0 +1,245 @@
+import json
+import random
+import statistics
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.test import Client
+from django.urls import reverse
+from polls.models import Choice, Pollsession, Question, VoterSession
+from users.models import User
+
+CHOICES_PER_QUESTION = 3
+
+# How often PostgreSQL is asked for the backends waiting on a lock, in seconds
+LOCK_SAMPLE_INTERVAL = 0.05
+
+WAITING_ON_LOCKS_SQL = """
+    SELECT count(*) FROM pg_stat_activity
+    WHERE datname = current_database() AND wait_event_type = 'Lock'
+"""
+DEADLOCKS_SQL = (
+    "SELECT deadlocks FROM pg_stat_database WHERE datname = current_database()"
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Simulate a general assembly vote: seed a poll, let concurrent voters open "
+        "and submit it through the full request cycle, and print the p50/p95/p99 "
+        "latencies and, on PostgreSQL, the lock waits as JSON. Run it against the "
+        "docker compose database with --settings=ddsc_web.settings.dev. The seeded "
+        "poll and voters are deleted afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--voters", type=int, default=100, help="Number of simulated voters"
+        )
+        parser.add_argument(
+            "--questions", type=int, default=5, help="Number of questions in the poll"
+        )
+        parser.add_argument(
+            "--concurrency",
+            type=int,
+            default=20,
+            help="Number of voters voting at the same time",
+        )
+        parser.add_argument(
+            "--seed", type=int, default=0, help="Seed of the voters' choices"
+        )
+        parser.add_argument(
+            "--host",
+            default="localhost",
+            help="Host of the simulated requests, must be in ALLOWED_HOSTS",
+        )
+        parser.add_argument(
+            "--keep", action="store_true", help="Keep the seeded poll and voters"
+        )
+        parser.add_argument("--output", type=str, help="Write the JSON to this file")
+
+    def handle(self, *args, **options):
+        if min(options["voters"], options["questions"], options["concurrency"]) < 1:
+            raise CommandError(
+                "--voters, --questions and --concurrency must be positive"
+            )
+        self.host = options["host"]
+        poll, voters = seed_poll(options["questions"], options["voters"])
+        self.choice_ids = defaultdict(list)
+        choices = Choice.objects.filter(question__poll_session=poll)
+        for question_id, choice_id in choices.values_list("question_id", "id"):
+            self.choice_ids[question_id].append(choice_id)
+        self.random_generator = random.Random(options["seed"])
+
+        try:
+            results = self.__run(poll, voters, options["concurrency"])
+        finally:
+            if not options["keep"]:
+                poll.delete()
+                User.objects.filter(id__in=[voter.id for voter in voters]).delete()
+
+        results |= {
+            "database": connection.vendor,
+            "voters": options["voters"],
+            "questions": options["questions"],
+            "concurrency": options["concurrency"],
+        }
+        output = json.dumps(results, indent=2)
+        if options["output"]:
+            Path(options["output"]).write_text(output + "\n")
+        else:
+            self.stdout.write(output)
+
+    def __run(self, poll: Pollsession, voters: list[User], concurrency: int) -> dict:
+        submissions = {
+            voter.id: [
+                (question_id, self.random_generator.choice(choice_ids))
+                for question_id, choice_ids in self.choice_ids.items()
+            ]
+            for voter in voters
+        }
+        lock_monitor = LockMonitor() if connection.vendor == "postgresql" else None
+        if lock_monitor:
+            lock_monitor.start()
+        started = time.perf_counter()
+        try:
+            with ThreadPoolExecutor(max_workers=concurrency) as executor:
+                timings = list(
+                    executor.map(
+                        lambda voter: self.__vote(poll, voter, submissions[voter.id]),
+                        voters,
+                    )
+                )
+        finally:
+            elapsed = time.perf_counter() - started
+            if lock_monitor:
+                lock_monitor.stop()
+
+        completed = VoterSession.objects.filter(
+            poll_session=poll, vote_completed_at__isnull=False
+        ).count()
+        return {
+            "elapsed_s": round(elapsed, 3),
+            "completed_votes": completed,
+            "failed_requests": sum(timing["failed"] for timing in timings),
+            "latencies": {
+                step: summarize([timing[step] for timing in timings])
+                for step in ["poll_detail", "submit_poll", "vote"]
+            },
+            "lock_waits": lock_monitor.summarize() if lock_monitor else None,
+        }
+
+    def __vote(self, poll: Pollsession, voter: User, question_choices) -> dict:
+        """Open and submit the poll like a browser, timing both requests."""
+        client = Client(HTTP_HOST=self.host)
+        try:
+            client.force_login(voter)
+
+            started = time.perf_counter()
+            detail = client.get(reverse("polls:poll_detail", args=[poll.id]))
+            opened = time.perf_counter()
+            voter_session_id = VoterSession.objects.get(
+                poll_session=poll, user=voter
+            ).id
+            resumed = time.perf_counter()
+            submit = client.post(
+                reverse("polls:submit_poll", args=[voter_session_id]),
+                {
+                    "question": [question for question, _ in question_choices],
+                    "choice": [choice for _, choice in question_choices],
+                },
+            )
+            finished = time.perf_counter()
+            return {
+                "poll_detail": opened - started,
+                "submit_poll": finished - resumed,
+                "vote": (opened - started) + (finished - resumed),
+                "failed": int(detail.status_code != 200)
+                + int(submit.status_code != 302),
+            }
+        finally:
+            # deletes the session force_login stored
+            client.logout()
+            connections.close_all()
+
+
+class LockMonitor:
+    """Samples, from its own connection, how many backends are waiting on a lock."""
+
+    def __init__(self):
+        self.samples = []
+        self.deadlocks = 0
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self.__sample, daemon=True)
+
+    def start(self):
+        self.deadlocks = -self.__count_deadlocks()
+        self.thread.start()
+
+    def stop(self):
+        self.stopped.set()
+        self.thread.join()
+        self.deadlocks += self.__count_deadlocks()
+
+    def summarize(self) -> dict:
+        return {
+            "samples": len(self.samples),
+            "samples_with_waits": sum(1 for waiting in self.samples if waiting),
+            "max_waiting": max(self.samples, default=0),
+            "mean_waiting": round(statistics.fmean(self.samples), 3)
+            if self.samples
+            else 0,
+            "deadlocks": self.deadlocks,
+        }
+
+    def __sample(self):
+        try:
+            with connection.cursor() as cursor:
+                while not self.stopped.wait(LOCK_SAMPLE_INTERVAL):
+                    cursor.execute(WAITING_ON_LOCKS_SQL)
+                    self.samples.append(cursor.fetchone()[0])
+        finally:
+            connections.close_all()
+
+    def __count_deadlocks(self) -> int:
+        with connection.cursor() as cursor:
+            cursor.execute(DEADLOCKS_SQL)
+            return cursor.fetchone()[0]
+
+
+def seed_poll(questions: int, voters: int) -> tuple[Pollsession, list[User]]:
+    poll = Pollsession.objects.create(
+        title=f"Load test {time.time():.0f}", description="Load test"
+    )
+    for i in range(questions):
+        question = Question.objects.create(poll_session=poll, text=f"Question {i}")
+        Choice.objects.bulk_create(
+            Choice(question=question, text=f"Choice {j}")
+            for j in range(CHOICES_PER_QUESTION)
+        )
+    # saved one by one like real signups, so the monthly user counter that their
+    # deletion decrements has counted them
+    users = [
+        User.objects.create(email=f"load-test-{poll.id}-{i}@example.com")
+        for i in range(voters)
+    ]
+    return poll, users
+
+
+def summarize(timings: list[float]) -> dict:
+    """Latency percentiles in milliseconds."""
+    if len(timings) < 2:
+        # quantiles needs at least two data points
+        timings = timings * 2
+    percentiles = statistics.quantiles(timings, n=100, method="inclusive")
+    return {
+        "p50_ms": round(percentiles[49] * 1000, 3),
+        "p95_ms": round(percentiles[94] * 1000, 3),
+        "p99_ms": round(percentiles[98] * 1000, 3),
+        "max_ms": round(max(timings) * 1000, 3),
+    }
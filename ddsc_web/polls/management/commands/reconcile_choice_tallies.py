@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from polls.models import Choice
+from polls.tallies import reconcile_tallies
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuild the running choice tallies of the live poll results from the "
+        "submitted answers"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--poll",
+            type=int,
+            action="append",
+            dest="polls",
+            help="Only reconcile the poll session with the id, can be repeated",
+        )
+
+    @transaction.atomic
+    def handle(self, *args, **options):
+        choices = Choice.objects.all()
+        if options["polls"]:
+            choices = choices.filter(question__poll_session__in=options["polls"])
+        corrected = reconcile_tallies(choices)
+        self.stdout.write(self.style.SUCCESS(f"Corrected {corrected} choice tallies"))
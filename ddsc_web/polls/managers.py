@@ -0,0 +1,25 @@
+from django.db import models
+from django.db.models import Count, Exists, OuterRef, Q
+from django.utils import timezone
+
+
+class PollsessionQuerySet(models.QuerySet):
+    def with_completion(self, user):
+        """
+        Annotate whether the user has completed each poll, is_completed, and how
+        many have, votes_completed, like user_has_completed and
+        votes_completed_count.
+        """
+        from .models import VoterSession
+
+        now = timezone.now()
+        completed_by_user = VoterSession.objects.filter(
+            poll_session=OuterRef("pk"), user=user, vote_completed_at__lt=now
+        )
+        return self.annotate(
+            is_completed=Exists(completed_by_user),
+            votes_completed=Count(
+                "voter_sessions",
+                filter=Q(voter_sessions__vote_completed_at__lte=now),
+            ),
+        )
@@ -0,0 +1,41 @@
+# Generated by Django 4.1.5 on 2026-10-18 12:31
+
+from django.db import migrations, models
+from django.db.models import Count
+import django.db.models.deletion
+
+
+def create_choice_tallies(apps, schema_editor):
+    Choice = apps.get_model("polls", "Choice")
+    ChoiceTally = apps.get_model("polls", "ChoiceTally")
+    ChoiceTally.objects.bulk_create(
+        ChoiceTally(choice_id=choice["id"], votes=choice["vote_count"])
+        for choice in Choice.objects.values("id").annotate(vote_count=Count("votes"))
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("polls", "0010_alter_answer_unique_together"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ChoiceTally",
+            fields=[
+                (
+                    "choice",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="tally",
+                        serialize=False,
+                        to="polls.choice",
+                    ),
+                ),
+                ("votes", models.IntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(create_choice_tallies, migrations.RunPython.noop),
+    ]
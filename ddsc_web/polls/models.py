@@ -1,9 +1,12 @@
 from django.db import models, IntegrityError
+from django.db.models import Count, Prefetch
 from django.contrib.auth import get_user_model
 from django.utils import timezone
 from django.core.exceptions import ObjectDoesNotExist
 from django.utils.translation import gettext_lazy as _
 
+from .managers import PollsessionQuerySet
+
 User = get_user_model()
 
 
@@ -29,6 +32,8 @@ class Pollsession(models.Model):
     )
     create = models.DateTimeField(auto_now_add=True)
 
+    objects = PollsessionQuerySet.as_manager()
+
     def __str__(self):
         return self.title
 
@@ -42,9 +47,10 @@ class Pollsession(models.Model):
         return self.voter_sessions.filter(vote_completed_at__lte=timezone.now()).count()
 
     def get_poll_results(self):
+        choices = Choice.objects.annotate(vote_count=Count("votes"))
+        questions = self.questions.prefetch_related(Prefetch("choices", choices))
         return {
-            question: question.get_choice_vote_results()
-            for question in self.questions.all()
+            question: get_vote_results(question.choices.all()) for question in questions
         }
 
 
@@ -87,13 +93,7 @@ class Question(models.Model):
         return self.text
 
     def get_choice_vote_results(self):
-        return {
-            choice: [
-                choice.votes.all().count(),
-                choice.get_choice_vote_proportion(),
-            ]
-            for choice in self.choices.all()
-        }
+        return get_vote_results(self.choices.annotate(vote_count=Count("votes")))
 
 
 class Choice(models.Model):
@@ -108,12 +108,33 @@ class Choice(models.Model):
     def __str__(self):
         return self.text
 
-    def get_choice_vote_proportion(self):
-        zero_vote_proportion = 0
-        try:
-            return self.votes.all().count() / self.question.votes.all().count()
-        except ZeroDivisionError:
-            return zero_vote_proportion
+
+class ChoiceTally(models.Model):
+    """
+    Running number of votes of a choice, updated with every submitted poll so
+    live results never recount the answers.
+    """
+
+    choice = models.OneToOneField(
+        Choice, on_delete=models.CASCADE, primary_key=True, related_name="tally"
+    )
+    votes = models.IntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.choice.text}: {self.votes}"
+
+
+def get_vote_results(choices) -> dict:
+    """
+    Votes and proportion of the question's votes of every choice, from choices
+    annotated with their vote_count.
+    """
+    choices = list(choices)
+    total = sum(choice.vote_count for choice in choices)
+    return {
+        choice: [choice.vote_count, choice.vote_count / total if total else 0]
+        for choice in choices
+    }
 
 
 class Answer(models.Model):
@@ -136,7 +157,7 @@ class Answer(models.Model):
     created = models.DateTimeField(auto_now_add=True)
 
     def save(self, *args, **kwargs):
-        if not self.question.choices.filter(choice=self.choice).exists():
+        if self.choice.question_id != self.question_id:
             raise IntegrityError("Choice must be related to Question")
         super().save(*args, **kwargs)
 
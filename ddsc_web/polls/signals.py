@@ -0,0 +1,36 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .models import Answer
+from .tallies import add_votes, remove_votes
+
+
+# Submissions bulk create their answers and update the tallies themselves. These
+# keep the tallies right for answers saved or deleted one by one, e.g. in the
+# admin or when a voter is deleted.
+@receiver(pre_save, sender=Answer)
+def remember_previous_choice(sender, instance, **kwargs):
+    instance.previous_choice_id = None
+    if not instance._state.adding:
+        instance.previous_choice_id = (
+            Answer.objects.filter(pk=instance.pk)
+            .values_list("choice_id", flat=True)
+            .first()
+        )
+
+
+@receiver(post_save, sender=Answer)
+def count_saved_answer(sender, instance, created, **kwargs):
+    if not created and instance.previous_choice_id == instance.choice_id:
+        return
+    with transaction.atomic():
+        if instance.previous_choice_id:
+            remove_votes([instance.previous_choice_id])
+        add_votes([instance.choice_id])
+
+
+@receiver(post_delete, sender=Answer)
+def count_deleted_answer(sender, instance, **kwargs):
+    with transaction.atomic():
+        remove_votes([instance.choice_id])
@@ -0,0 +1,72 @@
+from typing import Iterable
+
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Answer, Choice, VoterSession
+from .tallies import add_votes
+
+
+class PollSubmissionError(Exception):
+    pass
+
+
+class PollAlreadyCompletedError(PollSubmissionError):
+    pass
+
+
+def get_valid_choices(poll_session_id: int) -> set[tuple[int, int]]:
+    """The (question id, choice id) pairs that can be answered in the poll."""
+    return set(
+        Choice.objects.filter(question__poll_session=poll_session_id).values_list(
+            "question_id", "id"
+        )
+    )
+
+
+def parse_question_choices(questions: list[str], choices: list[str]):
+    """Pair up the posted question and choice ids as integers."""
+    if len(questions) != len(choices):
+        raise PollSubmissionError("Every question must have exactly one choice")
+    try:
+        return [
+            (int(question), int(choice)) for question, choice in zip(questions, choices)
+        ]
+    except ValueError:
+        raise PollSubmissionError("Question and choice ids must be integers")
+
+
+@transaction.atomic
+def submit_answers(
+    voter_session_id: int, question_choices: Iterable[tuple[int, int]]
+) -> list[Answer]:
+    """
+    Validate a submission against the choices of the poll, loaded once, and save
+    all of its answers with one bulk_create. The voter session is locked, so the
+    same voter cannot submit twice concurrently.
+    """
+    voter_session = (
+        VoterSession.objects.select_for_update()
+        .select_related("poll_session")
+        .get(pk=voter_session_id)
+    )
+    if voter_session.is_completed:
+        raise PollAlreadyCompletedError("The poll has already been answered")
+
+    question_choices = list(question_choices)
+    valid_choices = get_valid_choices(voter_session.poll_session_id)
+    if not set(question_choices) <= valid_choices:
+        raise PollSubmissionError("A choice does not belong to the poll")
+    answered = [question for question, _ in question_choices]
+    if len(set(answered)) != len(answered):
+        raise PollSubmissionError("A question is answered more than once")
+
+    voter = None if voter_session.poll_session.anonymous else voter_session.user_id
+    answers = Answer.objects.bulk_create(
+        Answer(voter_id=voter, question_id=question, choice_id=choice)
+        for question, choice in question_choices
+    )
+    add_votes(choice for _, choice in question_choices)
+    voter_session.vote_completed_at = timezone.now()
+    voter_session.save(update_fields=["vote_completed_at"])
+    return answers
@@ -0,0 +1,113 @@
+from collections import Counter, defaultdict
+from typing import Iterable
+
+from django.db.models import Count, F
+from django.db.models.functions import Coalesce
+
+from .models import Choice, ChoiceTally, Pollsession
+
+
+def add_votes(choice_ids: Iterable[int]):
+    """
+    Add the votes of a submission to the tallies. Must run in the transaction
+    that saves the answers, so the tallies are committed together with them.
+    """
+    votes = Counter(int(choice_id) for choice_id in choice_ids)
+    if not votes:
+        return
+    ChoiceTally.objects.bulk_create(
+        [ChoiceTally(choice_id=choice_id) for choice_id in votes],
+        ignore_conflicts=True,
+    )
+    update_tallies(votes)
+
+
+def remove_votes(choice_ids: Iterable[int]):
+    """Take the votes of deleted answers off the tallies, in the same transaction."""
+    votes = Counter(int(choice_id) for choice_id in choice_ids)
+    update_tallies({choice_id: -amount for choice_id, amount in votes.items()})
+
+
+def update_tallies(votes: dict[int, int]):
+    if not votes:
+        return
+    # lock the rows in a fixed order, so concurrent submissions cannot deadlock
+    list(
+        ChoiceTally.objects.select_for_update()
+        .filter(choice_id__in=votes)
+        .order_by("choice_id")
+        .values_list("choice_id", flat=True)
+    )
+    choice_ids_by_amount = defaultdict(list)
+    for choice_id, amount in votes.items():
+        choice_ids_by_amount[amount].append(choice_id)
+    for amount, choice_ids in choice_ids_by_amount.items():
+        ChoiceTally.objects.filter(choice_id__in=choice_ids).update(
+            votes=F("votes") + amount
+        )
+
+
+def get_poll_tallies(poll: Pollsession) -> dict:
+    """The running results of a poll, shaped for the JSON endpoint."""
+    choices = (
+        Choice.objects.filter(question__poll_session=poll)
+        .order_by("question_id", "id")
+        .values("id", "text", "question_id", "question__text")
+        .annotate(votes=Coalesce("tally__votes", 0))
+    )
+    questions = {}
+    for choice in choices:
+        question = questions.setdefault(
+            choice["question_id"],
+            {
+                "id": choice["question_id"],
+                "text": choice["question__text"],
+                "votes": 0,
+                "choices": [],
+            },
+        )
+        question["votes"] += choice["votes"]
+        question["choices"].append(
+            {"id": choice["id"], "text": choice["text"], "votes": choice["votes"]}
+        )
+    for question in questions.values():
+        for choice in question["choices"]:
+            choice["proportion"] = (
+                choice["votes"] / question["votes"] if question["votes"] else 0
+            )
+    return {
+        "poll": poll.id,
+        "votes_completed": poll.votes_completed_count(),
+        "questions": list(questions.values()),
+    }
+
+
+def reconcile_tallies(choices=None) -> int:
+    """
+    Rebuild the tallies of the choices from their answers. Returns the number of
+    tallies that were missing or wrong.
+    """
+    if choices is None:
+        choices = Choice.objects.all()
+    counts = dict(
+        choices.order_by()
+        .annotate(vote_count=Count("votes"))
+        .values_list("id", "vote_count")
+    )
+    tallies = dict(
+        ChoiceTally.objects.filter(choice_id__in=counts).values_list(
+            "choice_id", "votes"
+        )
+    )
+    wrong = [
+        ChoiceTally(choice_id=choice_id, votes=votes)
+        for choice_id, votes in counts.items()
+        if tallies.get(choice_id) != votes
+    ]
+    ChoiceTally.objects.bulk_create(
+        wrong,
+        update_conflicts=True,
+        unique_fields=["choice"],
+        update_fields=["votes"],
+    )
+    return len(wrong)
@@ -1,3 +1,353 @@
-from django.test import TestCase
+import json
+from io import StringIO
 
-# Create your tests here.
+from django.contrib.sessions.models import Session
+from django.core.management import call_command
+from django.db import IntegrityError
+from django.test import TestCase, TransactionTestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from .models import Answer, Choice, ChoiceTally, Pollsession, Question, VoterSession
+from .submissions import (
+    PollAlreadyCompletedError,
+    PollSubmissionError,
+    parse_question_choices,
+    submit_answers,
+)
+from stats.models import MonthlyCounter
+from users.models import User
+
+
+def create_poll(title: str, questions: int = 1, choices: int = 3) -> Pollsession:
+    poll = Pollsession.objects.create(title=title, description="Description")
+    for i in range(questions):
+        question = Question.objects.create(poll_session=poll, text=f"Question {i}")
+        Choice.objects.bulk_create(
+            Choice(question=question, text=f"Choice {j}") for j in range(choices)
+        )
+    return poll
+
+
+def vote(voter: User, choice: Choice) -> Answer:
+    return Answer.objects.create(
+        voter=voter, question_id=choice.question_id, choice=choice
+    )
+
+
+class PollResultsTest(TestCase):
+    # the questions and the choices annotated with their votes
+    EXPECTED_QUERIES = 2
+
+    def setUp(self):
+        self.users = User.objects.bulk_create(
+            User(email=f"voter{i}@ddsc.io") for i in range(4)
+        )
+
+    def test_results_count_votes_and_proportions(self):
+        poll = create_poll("Generalforsamling", questions=2)
+        first, second, third = Choice.objects.filter(question__text="Question 0")
+        for voter, choice in zip(self.users, [first, first, first, second]):
+            vote(voter, choice)
+
+        results = poll.get_poll_results()
+        self.assertEqual(
+            {question.text for question in results}, {"Question 0", "Question 1"}
+        )
+        question = Question.objects.get(poll_session=poll, text="Question 0")
+        self.assertEqual(
+            results[question], {first: [3, 0.75], second: [1, 0.25], third: [0, 0]}
+        )
+        self.assertEqual(results[question], question.get_choice_vote_results())
+        unanswered = Question.objects.get(poll_session=poll, text="Question 1")
+        self.assertEqual(list(results[unanswered].values()), [[0, 0]] * 3)
+
+    def test_results_query_count_is_constant(self):
+        small_poll = create_poll("Small", questions=1, choices=2)
+        with self.assertNumQueries(self.EXPECTED_QUERIES):
+            small_poll.get_poll_results()
+
+        large_poll = create_poll("Large", questions=10, choices=5)
+        for choice in Choice.objects.filter(question__poll_session=large_poll):
+            vote(self.users[0], choice)
+        with self.assertNumQueries(self.EXPECTED_QUERIES):
+            large_poll.get_poll_results()
+
+
+class ChoiceTallyTest(TestCase):
+    def setUp(self):
+        self.poll = create_poll("Generalforsamling", questions=2)
+        self.voters = User.objects.bulk_create(
+            User(email=f"voter{i}@ddsc.io") for i in range(3)
+        )
+        self.staff = User.objects.create(email="board@ddsc.io", is_staff=True)
+
+    def submit(self, voter: User, choices: list[Choice]):
+        voter_session = VoterSession.objects.create(user=voter, poll_session=self.poll)
+        self.client.force_login(voter)
+        self.client.post(
+            reverse("polls:submit_poll", args=[voter_session.id]),
+            {
+                "question": [choice.question_id for choice in choices],
+                "choice": [choice.id for choice in choices],
+            },
+        )
+
+    def get_choices(self, text: str) -> list[Choice]:
+        return list(Choice.objects.filter(text=text).order_by("question_id"))
+
+    def test_submissions_update_the_tallies(self):
+        self.submit(self.voters[0], self.get_choices("Choice 0"))
+        self.submit(self.voters[1], self.get_choices("Choice 0"))
+        self.submit(self.voters[2], self.get_choices("Choice 1"))
+
+        self.client.force_login(self.staff)
+        with self.assertNumQueries(5):
+            # session, user, poll and tallies, plus the completed votes
+            response = self.client.get(
+                reverse("polls:poll_results_json", args=[self.poll.id])
+            )
+        results = response.json()
+        self.assertEqual(results["votes_completed"], 3)
+        question = results["questions"][0]
+        self.assertEqual(question["votes"], 3)
+        self.assertEqual(
+            [(choice["votes"], choice["proportion"]) for choice in question["choices"]],
+            [(2, 2 / 3), (1, 1 / 3), (0, 0)],
+        )
+
+    def test_results_require_staff(self):
+        self.client.force_login(self.voters[0])
+        response = self.client.get(
+            reverse("polls:poll_results_json", args=[self.poll.id])
+        )
+        self.assertEqual(response.status_code, 302)
+
+    def test_results_page_refreshes_from_the_json_endpoint(self):
+        self.client.force_login(self.staff)
+        response = self.client.get(reverse("polls:poll_results", args=[self.poll.id]))
+        self.assertContains(
+            response, reverse("polls:poll_results_json", args=[self.poll.id])
+        )
+        self.assertNotContains(response, "EventSource")
+
+    def get_tallies(self, question: str) -> dict[str, int]:
+        return dict(
+            ChoiceTally.objects.filter(choice__question__text=question)
+            .order_by("choice__text")
+            .values_list("choice__text", "votes")
+        )
+
+    def test_answers_saved_or_deleted_one_by_one_update_the_tallies(self):
+        self.submit(self.voters[0], self.get_choices("Choice 0"))
+        first, second, _ = Choice.objects.filter(question__text="Question 0")
+        answer = vote(self.voters[1], first)
+        self.assertEqual(self.get_tallies("Question 0"), {"Choice 0": 2})
+
+        answer.choice = second
+        answer.save()
+        self.assertEqual(self.get_tallies("Question 0"), {"Choice 0": 1, "Choice 1": 1})
+
+        self.voters[0].delete()
+        self.assertEqual(self.get_tallies("Question 0"), {"Choice 0": 0, "Choice 1": 1})
+        self.assertEqual(self.get_tallies("Question 1"), {"Choice 0": 0})
+
+    def test_reconcile_rebuilds_tallies_from_answers(self):
+        self.submit(self.voters[0], self.get_choices("Choice 0"))
+        choice = self.get_choices("Choice 1")[0]
+        # bulk_create bypasses the tallies
+        Answer.objects.bulk_create(
+            [
+                Answer(
+                    voter=self.voters[1], question_id=choice.question_id, choice=choice
+                )
+            ]
+        )
+        ChoiceTally.objects.filter(choice__text="Choice 0").update(votes=5)
+
+        stdout = StringIO()
+        call_command("reconcile_choice_tallies", stdout=stdout)
+
+        self.assertIn("Corrected 6 choice tallies", stdout.getvalue())
+        self.assertEqual(
+            dict(
+                ChoiceTally.objects.filter(choice__question__text="Question 0")
+                .order_by("choice__text")
+                .values_list("choice__text", "votes")
+            ),
+            {"Choice 0": 1, "Choice 1": 1, "Choice 2": 0},
+        )
+
+
+class ListPollsTest(TestCase):
+    # session, user, the annotated polls and five for the menu of the base template
+    EXPECTED_QUERIES = 8
+
+    def setUp(self):
+        self.user = User.objects.create(email="voter@ddsc.io")
+        self.client.force_login(self.user)
+
+    def complete(self, poll: Pollsession, user: User):
+        VoterSession.objects.create(
+            user=user, poll_session=poll, vote_completed_at=timezone.now()
+        )
+
+    def test_completion_is_annotated(self):
+        completed = create_poll("Completed")
+        open_poll = create_poll("Open")
+        other = User.objects.create(email="other@ddsc.io")
+        self.complete(completed, self.user)
+        self.complete(completed, other)
+        self.complete(open_poll, other)
+
+        polls = {
+            poll.title: (poll.is_completed, poll.votes_completed)
+            for poll in Pollsession.objects.with_completion(self.user)
+        }
+        self.assertEqual(polls, {"Completed": (True, 2), "Open": (False, 1)})
+        self.assertEqual(
+            [polls[poll.title] for poll in Pollsession.objects.all()],
+            [
+                (poll.user_has_completed(self.user), poll.votes_completed_count())
+                for poll in Pollsession.objects.all()
+            ],
+        )
+
+    def test_index_query_count_is_constant(self):
+        self.complete(create_poll("First"), self.user)
+        with self.assertNumQueries(self.EXPECTED_QUERIES):
+            response = self.client.get(reverse("polls:list_polls"))
+        self.assertContains(response, "First")
+
+        for i in range(5):
+            create_poll(f"Poll {i}")
+        with self.assertNumQueries(self.EXPECTED_QUERIES):
+            response = self.client.get(reverse("polls:list_polls"))
+        self.assertContains(response, "Poll 4")
+
+
+class SubmitAnswersTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(email="voter@ddsc.io")
+
+    def start_voting(self, poll: Pollsession) -> VoterSession:
+        return VoterSession.objects.create(user=self.user, poll_session=poll)
+
+    def get_first_choices(self, poll: Pollsession) -> list[tuple[int, int]]:
+        return list(
+            Choice.objects.filter(question__poll_session=poll, text="Choice 0")
+            .order_by("question_id")
+            .values_list("question_id", "id")
+        )
+
+    def test_answers_are_validated_and_written_in_bulk(self):
+        for questions in [2, 10]:
+            poll = create_poll(f"Poll {questions}", questions=questions)
+            voter_session = self.start_voting(poll)
+            question_choices = self.get_first_choices(poll)
+            with self.assertNumQueries(9):
+                # savepoints, the locked voter session, the valid choices, the
+                # answers, three for the tallies and the completed voter session
+                submit_answers(voter_session.id, question_choices)
+
+            self.assertEqual(
+                Answer.objects.filter(question__poll_session=poll).count(), questions
+            )
+            voter_session.refresh_from_db()
+            self.assertTrue(voter_session.is_completed)
+
+    def test_invalid_submissions_are_rejected(self):
+        poll = create_poll("Poll", questions=2)
+        foreign_poll = create_poll("Foreign poll")
+        voter_session = self.start_voting(poll)
+        (first, first_choice), second = self.get_first_choices(poll)
+        invalid_submissions = [
+            [(first, first_choice), *self.get_first_choices(foreign_poll)],
+            [(first, first_choice), (first, first_choice + 1)],
+            [(first, second[1])],
+        ]
+        for question_choices in invalid_submissions:
+            with self.assertRaises(PollSubmissionError):
+                submit_answers(voter_session.id, question_choices)
+
+        self.assertFalse(Answer.objects.exists())
+        voter_session.refresh_from_db()
+        self.assertFalse(voter_session.is_completed)
+
+    def test_poll_can_only_be_submitted_once(self):
+        poll = create_poll("Poll")
+        voter_session = self.start_voting(poll)
+        submit_answers(voter_session.id, self.get_first_choices(poll))
+
+        with self.assertRaises(PollAlreadyCompletedError):
+            submit_answers(voter_session.id, self.get_first_choices(poll))
+        self.assertEqual(Answer.objects.count(), 1)
+
+    def test_anonymous_answers_have_no_voter(self):
+        poll = create_poll("Poll")
+        Pollsession.objects.filter(pk=poll.pk).update(anonymous=True)
+        submit_answers(self.start_voting(poll).id, self.get_first_choices(poll))
+
+        self.assertIsNone(Answer.objects.get().voter)
+
+    def test_posted_ids_must_pair_up_as_integers(self):
+        self.assertEqual(
+            parse_question_choices(["1", "2"], ["3", "4"]), [(1, 3), (2, 4)]
+        )
+        for questions, choices in [(["1"], ["3", "4"]), (["1"], ["x"])]:
+            with self.assertRaises(PollSubmissionError):
+                parse_question_choices(questions, choices)
+
+    def test_saved_answer_must_match_its_question(self):
+        poll = create_poll("Poll", questions=2)
+        first, second = Question.objects.filter(poll_session=poll)
+        with self.assertRaises(IntegrityError):
+            Answer.objects.create(
+                voter=self.user, question=first, choice=second.choices.first()
+            )
+
+    def test_invalid_post_redirects_to_the_poll(self):
+        poll = create_poll("Poll")
+        voter_session = self.start_voting(poll)
+        self.client.force_login(self.user)
+        response = self.client.post(
+            reverse("polls:submit_poll", args=[voter_session.id]),
+            {"question": [poll.questions.get().id], "choice": ["0"]},
+        )
+
+        self.assertRedirects(
+            response,
+            reverse("polls:poll_detail", args=[poll.id]),
+            fetch_redirect_response=False,
+        )
+        self.assertFalse(Answer.objects.exists())
+
+
+class LoadTestPollTest(TransactionTestCase):
+    def test_voters_complete_the_poll_and_are_cleaned_up(self):
+        User.objects.create(email="member@ddsc.io")
+        counters = list(MonthlyCounter.objects.values_list("name", "month", "total"))
+        stdout = StringIO()
+        call_command(
+            "load_test_poll",
+            "--voters=4",
+            "--questions=2",
+            "--concurrency=1",
+            stdout=stdout,
+        )
+
+        results = json.loads(stdout.getvalue())
+        self.assertEqual(results["completed_votes"], 4)
+        self.assertEqual(results["failed_requests"], 0)
+        self.assertEqual(
+            set(results["latencies"]["submit_poll"]),
+            {"p50_ms", "p95_ms", "p99_ms", "max_ms"},
+        )
+        self.assertIsNone(results["lock_waits"])
+        self.assertFalse(Pollsession.objects.exists())
+        self.assertEqual(User.objects.count(), 1)
+        self.assertFalse(Session.objects.exists())
+        self.assertEqual(
+            list(MonthlyCounter.objects.values_list("name", "month", "total")),
+            counters,
+        )
@@ -8,4 +8,9 @@ urlpatterns = [
     path("<int:poll_session_id>/", views.poll_detail, name="poll_detail"),
     path("<int:voter_session_id>/vote/", views.submit_poll, name="submit_poll"),
     path("<int:poll_session_id>/results/", views.poll_results, name="poll_results"),
+    path(
+        "<int:poll_session_id>/results.json",
+        views.poll_results_json,
+        name="poll_results_json",
+    ),
 ]
@@ -1,23 +1,32 @@
-from django.http import HttpResponseRedirect
+from django.http import HttpResponseRedirect, JsonResponse
 from django.shortcuts import get_object_or_404, render
 from django.urls import reverse
 from django.contrib.auth.decorators import login_required, user_passes_test
 from django.contrib import messages
-from django.db import transaction
-from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 
-from .models import Question, Choice, Pollsession, Answer, VoterSession
+from .models import Pollsession, VoterSession
 from .forms import QuestionChoiceForm
+from .submissions import (
+    PollAlreadyCompletedError,
+    PollSubmissionError,
+    parse_question_choices,
+    submit_answers,
+)
+from .tallies import get_poll_tallies
+
+# How often the results page fetches the tallies, in seconds
+POLL_RESULTS_REFRESH_INTERVAL = 5
 
 
 @login_required
 def list_polls(request):
-    poll_sessions = Pollsession.objects.filter(active=True)
+    poll_sessions = list(
+        Pollsession.objects.filter(active=True).with_completion(request.user)
+    )
     if poll_sessions:
-        is_completed = [poll.user_has_completed(request.user) for poll in poll_sessions]
         context = {
-            "polls_list": zip(poll_sessions, is_completed),
+            "polls_list": poll_sessions,
             "organisation_active": "active",
         }
         return render(request, "polls/index.html", context)
@@ -59,7 +68,6 @@ def poll_detail(request, poll_session_id):
 
 
 @login_required
-@transaction.atomic
 def submit_poll(request, voter_session_id):
     voter_session = get_object_or_404(
         VoterSession, pk=voter_session_id, user=request.user
@@ -68,34 +76,25 @@ def submit_poll(request, voter_session_id):
         messages.error(request, _("Du har allerede svaret på afstemningen"))
         return HttpResponseRedirect(reverse("polls:list_polls"))
     if request.method == "POST":
-        if voter_session.poll_session.anonymous:
-            answers_list = create_answer_objects(request)
-        else:
-            answers_list = create_answer_objects(request, user=request.user)
-
-        Answer.objects.bulk_create(answers_list)
-        voter_session.vote_completed_at = timezone.now()
-        voter_session.save()
+        try:
+            question_choices = parse_question_choices(
+                request.POST.getlist("question"), request.POST.getlist("choice")
+            )
+            submit_answers(voter_session.id, question_choices)
+        except PollAlreadyCompletedError:
+            messages.error(request, _("Du har allerede svaret på afstemningen"))
+            return HttpResponseRedirect(reverse("polls:list_polls"))
+        except PollSubmissionError:
+            messages.error(request, _("Besvarelsen af afstemningen er ugyldig"))
+            return HttpResponseRedirect(
+                reverse("polls:poll_detail", args=[voter_session.poll_session_id])
+            )
         messages.success(request, _("Tak for deltagelse i afstemningen"))
         return HttpResponseRedirect(reverse("polls:list_polls"))
     else:
         return HttpResponseRedirect(reverse("polls:list_polls"))
 
 
-def create_answer_objects(request, user=None):
-    question_choice = zip(
-        request.POST.getlist("question"), request.POST.getlist("choice")
-    )
-    return [
-        Answer(
-            voter=user,
-            question=Question(pk=question),
-            choice=Choice(pk=choice),
-        )
-        for question, choice in question_choice
-    ]
-
-
 @login_required
 @user_passes_test(lambda user: user.is_staff)
 def poll_results(request, poll_session_id):
@@ -107,6 +106,14 @@ def poll_results(request, poll_session_id):
         {
             "poll_results": poll_results,
             "poll": poll,
+            "refresh_interval": POLL_RESULTS_REFRESH_INTERVAL * 1000,
             "organisation_active": "active",
         },
     )
+
+
+@login_required
+@user_passes_test(lambda user: user.is_staff)
+def poll_results_json(request, poll_session_id):
+    poll = get_object_or_404(Pollsession, pk=poll_session_id)
+    return JsonResponse(get_poll_tallies(poll))
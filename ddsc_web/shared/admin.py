@@ -0,0 +1,11 @@
+from django.contrib import admin
+
+from .models import OutgoingEmail
+
+
+@admin.register(OutgoingEmail)
+class OutgoingEmailAdmin(admin.ModelAdmin):
+    list_display = ["created", "recipients", "status", "attempts", "sent"]
+    list_filter = ["status", "created"]
+    exclude = ["message"]
+    readonly_fields = ["last_error"]
@@ -0,0 +1,9 @@
+from django.apps import AppConfig
+
+
+class SharedConfig(AppConfig):
+    default_auto_field = "django.db.models.BigAutoField"
+    name = "shared"
+
+    def ready(self):
+        import shared.tasks
@@ -1,18 +1,28 @@
+from email import message_from_bytes
+from email.message import Message
 from email.mime.image import MIMEImage
+from io import BytesIO
 from pathlib import Path
 
-from django.core.mail import EmailMultiAlternatives
+from django.core.mail import EmailMessage, EmailMultiAlternatives
+from django.core.mail.message import MIMEMixin
+from PIL import Image
 
 
 # the function for sending an email
 def create_email_with_images(
     subject: str,
     text_content: str,
-    image_paths: Path,
+    image_paths: list[Path] | None = None,
     html_content=None,
     sender=None,
     recipient=None,
+    images: dict[str, bytes] | None = None,
 ):
+    """
+    Images are embedded either from files in 'image_paths', referenced by their
+    file name, or from in memory 'images' mapping a Content-ID to the image bytes.
+    """
     email = EmailMultiAlternatives(
         subject=subject,
         body=text_content,
@@ -24,14 +34,48 @@ def create_email_with_images(
     email.mixed_subtype = (
         "related"  # it is an important part that ensures embedding of an image
     )
-    for image_path in image_paths:
+    for image_path in image_paths or []:
         add_image(email, image_path)
+    for content_id, content in (images or {}).items():
+        add_image_content(email, content, content_id)
 
     return email
 
 
 def add_image(email: EmailMultiAlternatives, image_path: Path):
     with open(image_path, mode="rb") as f:
-        image = MIMEImage(f.read())
-        email.attach(image)
-        image.add_header("Content-ID", f"<{image_path.name}>")
+        add_image_content(email, f.read(), image_path.name)
+
+
+def add_image_content(email: EmailMultiAlternatives, content: bytes, content_id: str):
+    image = MIMEImage(content)
+    email.attach(image)
+    image.add_header("Content-ID", f"<{content_id}>")
+
+
+def downscale_image(content: bytes, max_width: int) -> bytes:
+    """Shrink an image to at most 'max_width' pixels wide and encode it as JPEG."""
+    image = Image.open(BytesIO(content))
+    if image.width > max_width:
+        image.thumbnail((max_width, image.height))
+    buffer = BytesIO()
+    image.convert("RGB").save(buffer, format="JPEG", quality=85, optimize=True)
+    return buffer.getvalue()
+
+
+class RenderedMIMEMessage(MIMEMixin, Message):
+    pass
+
+
+class RenderedEmailMessage(EmailMessage):
+    """
+    An email which has already been rendered to MIME, e.g. when stored in the
+    outbox. It is sent as is by any of Django's email backends.
+    """
+
+    def __init__(self, rendered_message: bytes, from_email: str, recipients: list[str]):
+        super().__init__(from_email=from_email, to=recipients)
+        self.rendered_message = rendered_message
+
+    def message(self):
+        return message_from_bytes(self.rendered_message, _class=RenderedMIMEMessage)
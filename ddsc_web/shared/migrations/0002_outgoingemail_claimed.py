@@ -0,0 +1,34 @@
+# Generated by Django 4.1.5 on 2026-10-18 12:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("shared", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="outgoingemail",
+            name="claimed",
+            field=models.DateTimeField(
+                blank=True, help_text="Hvornår afsendelsen blev påbegyndt", null=True
+            ),
+        ),
+        migrations.AlterField(
+            model_name="outgoingemail",
+            name="status",
+            field=models.CharField(
+                choices=[
+                    ("Pending", "Pending"),
+                    ("Sending", "Sending"),
+                    ("Sent", "Sent"),
+                    ("Failed", "Failed"),
+                ],
+                default="Pending",
+                max_length=25,
+            ),
+        ),
+    ]
@@ -25,3 +25,38 @@ class AbstractAddress(models.Model):
         null=True,
         blank=True,
     )
+
+
+class OutgoingEmail(models.Model):
+    """A rendered email waiting in the outbox to be sent in a batch."""
+
+    class Meta:
+        ordering = ["created"]
+        indexes = [
+            models.Index(fields=["status", "created"]),
+        ]
+
+    class StatusChoice(models.TextChoices):
+        PENDING = "Pending", _("Pending")
+        SENDING = "Sending", _("Sending")
+        SENT = "Sent", _("Sent")
+        FAILED = "Failed", _("Failed")
+
+    from_email = models.CharField(max_length=250)
+    recipients = models.JSONField()
+    message = models.BinaryField(help_text=_("Den færdige MIME besked"))
+    status = models.CharField(
+        max_length=25,
+        choices=StatusChoice.choices,
+        default=StatusChoice.PENDING,
+    )
+    attempts = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    created = models.DateTimeField(auto_now_add=True)
+    claimed = models.DateTimeField(
+        null=True, blank=True, help_text=_("Hvornår afsendelsen blev påbegyndt")
+    )
+    sent = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{', '.join(self.recipients)} - {self.status} - {self.created}"
@@ -0,0 +1,140 @@
+from datetime import timedelta
+
+from celery.utils.log import get_task_logger
+from ddsc_web.celery import celery_app
+from django.conf import settings
+from django.core.cache import cache
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .emails import RenderedEmailMessage
+from .models import OutgoingEmail
+
+logger = get_task_logger(__name__)
+
+OUTBOX_FLUSH_SCHEDULED_KEY = "outbox:flush_scheduled"
+
+
+def send_or_queue_email(email: EmailMessage):
+    """
+    Send the email right away, or put it in the outbox when EMAIL_USE_OUTBOX is
+    enabled so it is sent in a batch over a shared SMTP connection.
+    """
+    if settings.EMAIL_USE_OUTBOX:
+        queue_email(email)
+    else:
+        email.send()
+
+
+def queue_email(email: EmailMessage):
+    OutgoingEmail.objects.create(
+        from_email=str(email.from_email),
+        recipients=email.recipients(),
+        message=email.message().as_bytes(),
+    )
+    schedule_outbox_flush()
+
+
+def schedule_outbox_flush():
+    """Only one flush is scheduled per flush interval, whatever the mail volume."""
+    interval = settings.EMAIL_OUTBOX_FLUSH_INTERVAL
+    if cache.add(OUTBOX_FLUSH_SCHEDULED_KEY, True, interval):
+        transaction.on_commit(
+            lambda: send_queued_emails.apply_async(countdown=interval)
+        )
+
+
+@celery_app.task(name="send_queued_emails")
+def send_queued_emails():
+    try:
+        outgoing_emails = claim_outgoing_emails()
+        if outgoing_emails:
+            send_outgoing_emails(outgoing_emails)
+    finally:
+        # also when sending failed, so the outbox is never stranded
+        has_pending = OutgoingEmail.objects.filter(
+            status=OutgoingEmail.StatusChoice.PENDING
+        ).exists()
+        if has_pending:
+            cache.delete(OUTBOX_FLUSH_SCHEDULED_KEY)
+            schedule_outbox_flush()
+
+
+def claim_outgoing_emails() -> list[OutgoingEmail]:
+    """
+    Mark a batch as being sent and commit, so no rows stay locked during the SMTP
+    round-trips. A batch whose worker died while sending it is claimed again once
+    EMAIL_OUTBOX_CLAIM_TIMEOUT has passed.
+    """
+    now = timezone.now()
+    claim_expired = now - timedelta(seconds=settings.EMAIL_OUTBOX_CLAIM_TIMEOUT)
+    with transaction.atomic():
+        outgoing_emails = list(
+            OutgoingEmail.objects.select_for_update(skip_locked=True).filter(
+                Q(status=OutgoingEmail.StatusChoice.PENDING)
+                | Q(
+                    status=OutgoingEmail.StatusChoice.SENDING, claimed__lt=claim_expired
+                )
+            )[: settings.EMAIL_OUTBOX_BATCH_SIZE]
+        )
+        for outgoing_email in outgoing_emails:
+            outgoing_email.status = OutgoingEmail.StatusChoice.SENDING
+            outgoing_email.claimed = now
+        OutgoingEmail.objects.bulk_update(outgoing_emails, ["status", "claimed"])
+    return outgoing_emails
+
+
+def send_outgoing_emails(outgoing_emails: list[OutgoingEmail]):
+    """
+    Send the batch over a single connection. Failed emails stay in the outbox and
+    are retried by the next flush until EMAIL_OUTBOX_MAX_ATTEMPTS is reached.
+    """
+    sent = 0
+    try:
+        with get_connection() as connection:
+            for outgoing_email in outgoing_emails:
+                try:
+                    connection.send_messages([to_email_message(outgoing_email)])
+                    mark_as_sent(outgoing_email)
+                    sent += 1
+                except Exception as e:
+                    mark_as_failed_attempt(outgoing_email, e)
+    except Exception as e:
+        # the SMTP server could not be reached, counts as an attempt for the batch
+        for outgoing_email in outgoing_emails:
+            if outgoing_email.status == OutgoingEmail.StatusChoice.SENDING:
+                mark_as_failed_attempt(outgoing_email, e)
+
+    OutgoingEmail.objects.bulk_update(
+        outgoing_emails,
+        ["status", "attempts", "last_error", "sent", "message"],
+    )
+    logger.info(f"Sent {sent} of {len(outgoing_emails)} queued emails")
+
+
+def to_email_message(outgoing_email: OutgoingEmail) -> RenderedEmailMessage:
+    return RenderedEmailMessage(
+        bytes(outgoing_email.message),
+        from_email=outgoing_email.from_email,
+        recipients=outgoing_email.recipients,
+    )
+
+
+def mark_as_sent(outgoing_email: OutgoingEmail):
+    outgoing_email.status = OutgoingEmail.StatusChoice.SENT
+    outgoing_email.sent = timezone.now()
+    outgoing_email.attempts += 1
+    # the rendered message can be large, no need to keep it once delivered
+    outgoing_email.message = b""
+
+
+def mark_as_failed_attempt(outgoing_email: OutgoingEmail, error: Exception):
+    outgoing_email.attempts += 1
+    outgoing_email.last_error = str(error)
+    if outgoing_email.attempts >= settings.EMAIL_OUTBOX_MAX_ATTEMPTS:
+        outgoing_email.status = OutgoingEmail.StatusChoice.FAILED
+    else:
+        outgoing_email.status = OutgoingEmail.StatusChoice.PENDING
+    logger.error(f"Failed to send queued email {outgoing_email.pk}: {error}")
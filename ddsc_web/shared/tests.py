@@ -0,0 +1,91 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.core import mail
+from django.core.mail import EmailMessage
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from . import tasks
+from .models import OutgoingEmail
+
+
+@override_settings(EMAIL_USE_OUTBOX=True, EMAIL_OUTBOX_MAX_ATTEMPTS=2)
+class OutboxTest(TestCase):
+    def queue_emails(self, number_of_emails: int):
+        with mock.patch.object(tasks, "schedule_outbox_flush"):
+            for i in range(number_of_emails):
+                tasks.send_or_queue_email(
+                    EmailMessage("Subject", "Body", to=[f"user{i}@ddsc.io"])
+                )
+
+    def test_queued_emails_are_sent_over_one_connection(self):
+        self.queue_emails(3)
+        self.assertEqual(len(mail.outbox), 0)
+
+        with mock.patch.object(
+            tasks, "get_connection", wraps=tasks.get_connection
+        ) as get_connection:
+            tasks.send_queued_emails()
+
+        get_connection.assert_called_once()
+        self.assertEqual(
+            [email.to for email in mail.outbox],
+            [["user0@ddsc.io"], ["user1@ddsc.io"], ["user2@ddsc.io"]],
+        )
+        self.assertFalse(
+            OutgoingEmail.objects.exclude(
+                status=OutgoingEmail.StatusChoice.SENT
+            ).exists()
+        )
+
+    def test_failed_emails_are_retried_until_max_attempts(self):
+        self.queue_emails(1)
+        with mock.patch.object(
+            tasks, "to_email_message", side_effect=ValueError("Invalid address")
+        ), mock.patch.object(tasks, "schedule_outbox_flush"):
+            tasks.send_queued_emails()
+            self.assertEqual(
+                OutgoingEmail.objects.get().status,
+                OutgoingEmail.StatusChoice.PENDING,
+            )
+            tasks.send_queued_emails()
+
+        outgoing_email = OutgoingEmail.objects.get()
+        self.assertEqual(outgoing_email.status, OutgoingEmail.StatusChoice.FAILED)
+        self.assertEqual(outgoing_email.last_error, "Invalid address")
+
+    def test_unreachable_smtp_server_counts_an_attempt_and_reschedules(self):
+        self.queue_emails(2)
+        with mock.patch.object(
+            tasks, "get_connection", side_effect=OSError("Connection refused")
+        ), mock.patch.object(tasks, "schedule_outbox_flush") as schedule:
+            tasks.send_queued_emails()
+
+        schedule.assert_called_once()
+        self.assertEqual(
+            list(OutgoingEmail.objects.values_list("status", "attempts")),
+            [(OutgoingEmail.StatusChoice.PENDING, 1)] * 2,
+        )
+
+    def test_emails_are_claimed_before_sending_and_expired_claims_resent(self):
+        self.queue_emails(2)
+        OutgoingEmail.objects.filter(pk=OutgoingEmail.objects.first().pk).update(
+            status=OutgoingEmail.StatusChoice.SENDING,
+            claimed=timezone.now() - timedelta(hours=1),
+        )
+        to_email_message = tasks.to_email_message
+        statuses_while_sending = []
+
+        def record_status(outgoing_email):
+            outgoing_email.refresh_from_db(fields=["status"])
+            statuses_while_sending.append(outgoing_email.status)
+            return to_email_message(outgoing_email)
+
+        with mock.patch.object(tasks, "to_email_message", record_status):
+            tasks.send_queued_emails()
+
+        self.assertEqual(
+            statuses_while_sending, [OutgoingEmail.StatusChoice.SENDING] * 2
+        )
+        self.assertEqual(len(mail.outbox), 2)
@@ -0,0 +1,116 @@
+import heapq
+import math
+from collections import defaultdict
+from decimal import ROUND_HALF_UP, Decimal
+from itertools import groupby, islice
+from operator import itemgetter
+
+from django.db import transaction
+
+from .decorators import bump_cache_generation
+from .models import SURVEY_CACHE_NAMESPACE, SalaryAggregate, SurveyAnswer
+
+# Answers given by this many respondents or fewer are not shown
+MINIMUM_ANSWER_COUNT = 5
+
+
+def get_salary_answers(years: list[int] | None = None):
+    """Answers of the respondents who gave their salary."""
+    queryset = SurveyAnswer.objects.filter(
+        answer__isnull=False,
+        respondent__monthly_salary__isnull=False,
+        respondent__monthly_salary__gt=0,
+    ).exclude(answer="")
+    if years:
+        queryset = queryset.filter(respondent__year__in=years)
+    return queryset
+
+
+def get_salary_rows(years: list[int] | None = None, question: str | None = None):
+    """(question id, year, answer, monthly_salary) rows, streamed in group order."""
+    fields = [
+        "question_id",
+        "respondent__year",
+        "answer",
+        "respondent__monthly_salary",
+    ]
+    queryset = get_salary_answers(years)
+    if question is not None:
+        queryset = queryset.filter(question__text=question)
+    return queryset.order_by(*fields).values_list(*fields).iterator(chunk_size=10_000)
+
+
+def iter_salary_aggregates(rows):
+    for (question_id, year, answer), group in groupby(rows, key=itemgetter(0, 1, 2)):
+        salaries = [row[3] for row in group]
+        yield SalaryAggregate(
+            question_id=question_id,
+            year=year,
+            answer=answer,
+            count=len(salaries),
+            total=sum(salaries),
+            minimum=salaries[0],
+            maximum=salaries[-1],
+            salaries=salaries,
+        )
+
+
+@transaction.atomic
+def rebuild_salary_aggregates(
+    years: list[int] | None = None, batch_size: int = 1000
+) -> int:
+    """Replace the aggregates of the given years, or all of them, from the answers."""
+    stale_aggregates = SalaryAggregate.objects.all()
+    if years:
+        stale_aggregates = stale_aggregates.filter(year__in=years)
+    stale_aggregates.delete()
+
+    aggregates = iter_salary_aggregates(get_salary_rows(years))
+    created = 0
+    while batch := list(islice(aggregates, batch_size)):
+        SalaryAggregate.objects.bulk_create(batch)
+        created += len(batch)
+
+    transaction.on_commit(lambda: bump_cache_generation(SURVEY_CACHE_NAMESPACE))
+    return created
+
+
+def percentile_disc(sorted_values: list[int], fraction: float) -> int:
+    """Same as PostgreSQL's percentile_disc: the first value at or above the fraction."""
+    index = max(math.ceil(fraction * len(sorted_values)) - 1, 0)
+    return sorted_values[index]
+
+
+def round_half_up(value: Decimal) -> Decimal:
+    return value.quantize(Decimal(1), rounding=ROUND_HALF_UP)
+
+
+def combine_salary_aggregates(aggregates) -> list[dict]:
+    """
+    Combine the per-year aggregates of each answer into the rows returned by
+    get_salary_stats_by_answer.
+    """
+    aggregates_by_answer = defaultdict(list)
+    for aggregate in aggregates:
+        aggregates_by_answer[aggregate.answer].append(aggregate)
+
+    rows = []
+    for answer, answer_aggregates in aggregates_by_answer.items():
+        count = sum(aggregate.count for aggregate in answer_aggregates)
+        if count <= MINIMUM_ANSWER_COUNT:
+            continue
+        salaries = list(
+            heapq.merge(*(aggregate.salaries for aggregate in answer_aggregates))
+        )
+        total = sum(aggregate.total for aggregate in answer_aggregates)
+        rows.append(
+            {
+                "answer": answer,
+                "count": count,
+                "average": round_half_up(Decimal(total) / count),
+                "min": min(aggregate.minimum for aggregate in answer_aggregates),
+                "max": max(aggregate.maximum for aggregate in answer_aggregates),
+                "median": percentile_disc(salaries, 0.5),
+            }
+        )
+    return rows
@@ -0,0 +1,44 @@
+from datetime import date, datetime
+
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import MonthlyCounter
+
+# counter name: (app name, model name, date field)
+COUNTED_MODELS = {
+    "users": ("users", "User", "date_joined"),
+    "members": ("members", "Member", "created"),
+    "event_registrations": ("events", "EventRegistration", "created"),
+}
+
+
+def get_month(moment: datetime) -> date:
+    """The first day of the month in the current timezone, like TruncMonth."""
+    return timezone.localtime(moment).date().replace(day=1)
+
+
+def add_to_monthly_counter(name: str, moment: datetime, amount: int):
+    month = get_month(moment)
+    counters = MonthlyCounter.objects.filter(name=name, month=month)
+    if counters.update(total=F("total") + amount):
+        return
+    try:
+        with transaction.atomic():
+            MonthlyCounter.objects.create(name=name, month=month, total=amount)
+    except IntegrityError:
+        # created concurrently by another process
+        counters.update(total=F("total") + amount)
+
+
+def get_monthly_counter_series() -> dict[str, list[dict]]:
+    """
+    The rows of every counter, shaped like get_object_stats_by_month for
+    get_labels_and_data.
+    """
+    series = {name: [] for name in COUNTED_MODELS}
+    counters = MonthlyCounter.objects.filter(total__gt=0).order_by("name", "month")
+    for counter in counters.values("name", "month", "total"):
+        series[counter.pop("name")].append(counter)
+    return series
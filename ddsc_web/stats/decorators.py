@@ -1,7 +1,17 @@
+from datetime import datetime
 from functools import wraps
 from django.core.cache import cache
+from django.utils import timezone
 import hashlib
 import pickle
+import time
+
+DEFAULT_NAMESPACE = "stats"
+
+# How long one process may hold the right to recompute a cached result
+RECOMPUTE_LOCK_TIMEOUT = 60
+# How often processes waiting for a missing result check whether it has arrived
+RECOMPUTE_POLL_INTERVAL = 0.1
 
 
 def make_hash_key(*args, **kwargs):
@@ -9,33 +19,93 @@ def make_hash_key(*args, **kwargs):
     return hashlib.md5(pickled_arguments).hexdigest()
 
 
-def cache_function_result(timeout: int):
-    def decorator(func):
-        @wraps(func)
-        def inner(*args, **kwargs):
-            cache_key = f"function:{func.__name__}"
-            result = cache.get(cache_key)
-            if result is None:
-                result = func(*args, **kwargs)
-                cache.set(cache_key, result, timeout)
-            return result
+def get_generation_key(namespace: str) -> str:
+    return f"generation:{namespace}"
 
-        return inner
 
-    return decorator
+def get_generation_changed_key(namespace: str) -> str:
+    return f"generation_changed:{namespace}"
+
+
+def get_cache_generation(namespace: str) -> int:
+    return cache.get_or_set(get_generation_key(namespace), 1, timeout=None)
+
+
+def get_cache_generation_changed(namespace: str) -> datetime:
+    """When the namespace was last invalidated, or first looked up after a flush."""
+    return cache.get_or_set(
+        get_generation_changed_key(namespace), timezone.now, timeout=None
+    )
+
+
+def bump_cache_generation(namespace: str):
+    """
+    Invalidate every result cached in the namespace at once. The entries are not
+    deleted, their keys are just never looked up again and expire on their own.
+    """
+    generation_key = get_generation_key(namespace)
+    cache.add(generation_key, 1, timeout=None)
+    cache.incr(generation_key)
+    cache.set(get_generation_changed_key(namespace), timezone.now(), timeout=None)
 
 
-def cache_query_result(timeout: int):
+def make_cache_key(prefix: str, namespace: str, func, args, kwargs) -> str:
+    generation = get_cache_generation(namespace)
+    name = f"{func.__module__}.{func.__qualname__}"
+    return f"{prefix}:{namespace}:{generation}:{name}:{make_hash_key(*args, **kwargs)}"
+
+
+def compute_and_cache(cache_key: str, timeout: int, compute):
+    result = compute()
+    # kept for another timeout after going stale, to serve while recomputing
+    cache.set(cache_key, (result, time.time() + timeout), timeout * 2)
+    return result
+
+
+def get_or_compute(cache_key: str, timeout: int, compute):
+    """
+    Single-flight caching: when an entry is stale or missing only the process
+    holding the lock recomputes it. Others serve the stale value meanwhile, or
+    wait for the fresh one when there is nothing to serve.
+    """
+    lock_key = f"lock:{cache_key}"
+    entry = cache.get(cache_key)
+    if entry is not None:
+        result, fresh_until = entry
+        if time.time() < fresh_until:
+            return result
+        if not cache.add(lock_key, True, RECOMPUTE_LOCK_TIMEOUT):
+            return result
+    elif not cache.add(lock_key, True, RECOMPUTE_LOCK_TIMEOUT):
+        deadline = time.monotonic() + RECOMPUTE_LOCK_TIMEOUT
+        while time.monotonic() < deadline:
+            time.sleep(RECOMPUTE_POLL_INTERVAL)
+            entry = cache.get(cache_key)
+            if entry is not None:
+                return entry[0]
+        return compute_and_cache(cache_key, timeout, compute)
+
+    try:
+        return compute_and_cache(cache_key, timeout, compute)
+    finally:
+        cache.delete(lock_key)
+
+
+def cache_result(prefix: str, timeout: int, namespace: str):
     def decorator(func):
         @wraps(func)
         def inner(*args, **kwargs):
-            cache_key = f"query:{func.__name__}:{make_hash_key(*args, **kwargs)}"
-            result = cache.get(cache_key)
-            if result is None:
-                result = func(*args, **kwargs)
-                cache.set(cache_key, result, timeout)
-            return result
+            cache_key = make_cache_key(prefix, namespace, func, args, kwargs)
+            return get_or_compute(cache_key, timeout, lambda: func(*args, **kwargs))
 
         return inner
 
     return decorator
+
+
+def cache_function_result(timeout: int, namespace: str = DEFAULT_NAMESPACE):
+    return cache_result("function", timeout, namespace)
+
+
+def cache_query_result(timeout: int, namespace: str = DEFAULT_NAMESPACE):
+    return cache_result("query", timeout, namespace)
@@ -0,0 +1,210 @@
+"""
+In-memory, column-oriented copy of the salary survey for grouped statistics
+that would each be a heavy query over the survey answers.
+
+Every survey year holds one salary vector and one row of dictionary-encoded
+answer codes per question, all indexed by respondent (user_id).
+"""
+from collections import defaultdict
+from dataclasses import dataclass
+from decimal import Decimal
+from functools import lru_cache
+
+import numpy as np
+
+from .aggregates import MINIMUM_ANSWER_COUNT, round_half_up
+from .decorators import get_cache_generation
+from .models import SURVEY_CACHE_NAMESPACE, SurveyAnswer
+
+# Answer code of a question the respondent did not answer
+MISSING = -1
+
+
+@dataclass
+class SurveyYear:
+    user_ids: np.ndarray  # (respondents,)
+    salaries: np.ndarray  # (respondents,), 0 when not given
+    answer_codes: np.ndarray  # (questions, respondents)
+
+
+@dataclass
+class SalaryGroups:
+    """Salaries of the valid respondents, sorted by group and then by salary."""
+
+    group_answers: list[tuple[str, ...]]
+    counts: np.ndarray
+    starts: np.ndarray
+    salaries: np.ndarray
+
+    @classmethod
+    def empty(cls) -> "SalaryGroups":
+        return cls([], *(np.empty(0, dtype=np.int64),) * 3)
+
+
+class SurveyEngine:
+    def __init__(
+        self,
+        questions: list[str],
+        answers: list[list[str]],
+        years: dict[int, SurveyYear],
+    ):
+        self.questions = questions
+        self.question_codes = {question: i for i, question in enumerate(questions)}
+        self.answers = answers
+        self.years = years
+
+    @classmethod
+    def from_rows(cls, rows) -> "SurveyEngine":
+        """Build from (year, user_id, question, answer, monthly_salary) rows."""
+        question_codes = {}
+        answer_codes = []
+        columns_by_year = defaultdict(lambda: ([], [], [], []))
+        for year, user_id, question, answer, monthly_salary in rows:
+            question_code = question_codes.setdefault(question, len(question_codes))
+            if question_code == len(answer_codes):
+                answer_codes.append({})
+            if answer:
+                codes = answer_codes[question_code]
+                answer_code = codes.setdefault(answer, len(codes))
+            else:
+                answer_code = MISSING
+            columns = columns_by_year[year]
+            columns[0].append(user_id)
+            columns[1].append(question_code)
+            columns[2].append(answer_code)
+            columns[3].append(monthly_salary or 0)
+
+        years = {
+            year: build_survey_year(len(question_codes), *columns)
+            for year, columns in columns_by_year.items()
+        }
+        return cls(
+            questions=list(question_codes),
+            answers=[list(codes) for codes in answer_codes],
+            years=years,
+        )
+
+    def group_salaries(self, questions: list[str], years: list[int]) -> SalaryGroups:
+        """Group the respondents with a salary by their answers to the questions."""
+        question_codes = [self.question_codes[question] for question in questions]
+        survey_years = [self.years[year] for year in years if year in self.years]
+        if not survey_years:
+            return SalaryGroups.empty()
+
+        salaries = np.concatenate([y.salaries for y in survey_years])
+        answer_codes = np.concatenate(
+            [y.answer_codes[question_codes] for y in survey_years], axis=1
+        )
+        valid = (salaries > 0) & (answer_codes != MISSING).all(axis=0)
+        if not valid.any():
+            return SalaryGroups.empty()
+        salaries = salaries[valid]
+        answer_codes = answer_codes[:, valid]
+
+        dimensions = [len(self.answers[code]) for code in question_codes]
+        group_ids = np.ravel_multi_index(tuple(answer_codes), dimensions)
+        order = np.lexsort((salaries, group_ids))
+        groups, starts, counts = np.unique(
+            group_ids[order], return_index=True, return_counts=True
+        )
+        group_answers = [
+            tuple(
+                self.answers[question_code][answer_code]
+                for question_code, answer_code in zip(question_codes, answer_code_row)
+            )
+            for answer_code_row in zip(*np.unravel_index(groups, dimensions))
+        ]
+        return SalaryGroups(group_answers, counts, starts, salaries[order])
+
+    def grouped_salary_stats(
+        self,
+        questions: list[str],
+        years: list[int],
+        quantiles: tuple[float, ...] = (0.5,),
+    ) -> list[dict]:
+        """
+        Count, average, min, max and quantiles of the salaries by the answers to
+        one or more questions. Quantiles follow percentile_disc.
+        """
+        groups = self.group_salaries(questions, years)
+        if not len(groups.group_answers):
+            return []
+        ends = groups.starts + groups.counts - 1
+        totals = np.add.reduceat(groups.salaries, groups.starts)
+        quantile_values = {
+            quantile: groups.salaries[
+                groups.starts
+                + np.maximum(np.ceil(quantile * groups.counts).astype(int) - 1, 0)
+            ]
+            for quantile in quantiles
+        }
+        return [
+            {
+                "answers": answers,
+                "count": int(groups.counts[i]),
+                "average": round_half_up(
+                    Decimal(int(totals[i])) / int(groups.counts[i])
+                ),
+                "min": int(groups.salaries[groups.starts[i]]),
+                "max": int(groups.salaries[ends[i]]),
+                "quantiles": {
+                    q: int(values[i]) for q, values in quantile_values.items()
+                },
+            }
+            for i, answers in enumerate(groups.group_answers)
+            if groups.counts[i] > MINIMUM_ANSWER_COUNT
+        ]
+
+    def get_salary_stats_by_answer(self, question: str, years: list[int]) -> list[dict]:
+        """Unordered rows of stats.queries.get_salary_stats_by_answer."""
+        if question not in self.question_codes:
+            return []
+        return [
+            {
+                "answer": row["answers"][0],
+                "count": row["count"],
+                "average": row["average"],
+                "min": row["min"],
+                "max": row["max"],
+                "median": row["quantiles"][0.5],
+            }
+            for row in self.grouped_salary_stats([question], years)
+        ]
+
+
+def build_survey_year(
+    number_of_questions: int,
+    user_ids: list[int],
+    question_codes: list[int],
+    answer_codes: list[int],
+    salaries: list[int],
+) -> SurveyYear:
+    respondents, respondent_index = np.unique(
+        np.asarray(user_ids, dtype=np.int64), return_inverse=True
+    )
+    codes = np.full((number_of_questions, len(respondents)), MISSING, dtype=np.int32)
+    codes[np.asarray(question_codes), respondent_index] = answer_codes
+    respondent_salaries = np.zeros(len(respondents), dtype=np.int64)
+    np.maximum.at(respondent_salaries, respondent_index, salaries)
+    return SurveyYear(respondents, respondent_salaries, codes)
+
+
+@lru_cache(maxsize=1)
+def load_survey_engine(generation: int) -> SurveyEngine:
+    rows = (
+        SurveyAnswer.objects.order_by()
+        .values_list(
+            "respondent__year",
+            "respondent__user_id",
+            "question__text",
+            "answer",
+            "respondent__monthly_salary",
+        )
+        .iterator(chunk_size=10_000)
+    )
+    return SurveyEngine.from_rows(rows)
+
+
+def get_survey_engine() -> SurveyEngine:
+    """One engine per process, reloaded when the survey data cache is invalidated."""
+    return load_survey_engine(get_cache_generation(SURVEY_CACHE_NAMESPACE))
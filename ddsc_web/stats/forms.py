@@ -3,7 +3,7 @@ from crispy_forms.layout import Div, Layout
 from django import forms
 
 from .decorators import cache_function_result
-from .models import SurveyData
+from .models import SURVEY_CACHE_NAMESPACE, SurveyQuestion, SurveyRespondent
 from .layouts import question_field_layout, year_field_layout
 
 
@@ -18,23 +18,24 @@ def get_exclude_list() -> list[str]:
     ]
 
 
-@cache_function_result(timeout=60 * 60 * 24)
+@cache_function_result(timeout=60 * 60 * 24, namespace=SURVEY_CACHE_NAMESPACE)
 def get_question_choices(exlude_list: list[str]) -> list[tuple[str, str]]:
     return [
         (q, q)
-        for q in set(
-            SurveyData.objects.values_list("question", flat=True)
-            .exclude(question__in=exlude_list)
-            .distinct()
+        for q in SurveyQuestion.objects.values_list("text", flat=True).exclude(
+            text__in=exlude_list
         )
     ]
 
 
-@cache_function_result(timeout=60 * 60 * 24)
+@cache_function_result(timeout=60 * 60 * 24, namespace=SURVEY_CACHE_NAMESPACE)
 def get_year_choices() -> list[tuple[int, int]]:
-    return [
-        (y, y) for y in sorted(set(SurveyData.objects.values_list("year", flat=True)))
-    ]
+    years = (
+        SurveyRespondent.objects.values_list("year", flat=True)
+        .order_by("year")
+        .distinct()
+    )
+    return [(y, y) for y in years]
 
 
 class QuestionForm(forms.Form):
@@ -64,3 +65,8 @@ class QuestionForm(forms.Form):
                 css_class="form-group mb-1",
             ),
         )
+
+    def clean_year(self) -> list[int]:
+        # the same selection must give the same cached query results, whatever
+        # the order of the years or the view they come from
+        return sorted({int(year) for year in self.cleaned_data["year"]})
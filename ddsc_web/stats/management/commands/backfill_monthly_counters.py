@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from stats.counters import COUNTED_MODELS, get_month
+from stats.models import MonthlyCounter
+from stats.queries import get_object_stats_by_month
+
+
+class Command(BaseCommand):
+    help = "Rebuild the monthly counters of the stats dashboard from the counted tables"
+
+    @transaction.atomic
+    def handle(self, *args, **options):
+        for name, counted_model in COUNTED_MODELS.items():
+            MonthlyCounter.objects.filter(name=name).delete()
+            counters = MonthlyCounter.objects.bulk_create(
+                MonthlyCounter(
+                    name=name, month=get_month(row["month"]), total=row["total"]
+                )
+                for row in get_object_stats_by_month(*counted_model)
+            )
+            self.stdout.write(
+                self.style.SUCCESS(f"Backfilled {len(counters)} months of {name}")
+            )
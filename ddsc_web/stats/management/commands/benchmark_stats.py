@@ -0,0 +1,279 @@
+import json
+import random
+import statistics
+import time
+from datetime import timedelta
+from io import StringIO
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import OuterRef, Subquery
+from django.test import Client
+from django.urls import reverse
+from django.utils import timezone
+from events.models import Event, EventRegistration
+from members.models import Member
+from stats.aggregates import rebuild_salary_aggregates
+from stats.counters import COUNTED_MODELS
+from stats.decorators import bump_cache_generation
+from stats.models import SURVEY_CACHE_NAMESPACE
+from stats.queries import (
+    YEARS_OF_EXPERIENCE_ANSWERS,
+    YEARS_OF_EXPERIENCE_QUSTION,
+    get_object_stats_by_month,
+    get_salary_stats_by_answer,
+)
+from stats.survey_files import SurveyWriter, batched
+from users.models import User
+
+JOB_TITLE_QUESTION = "What is your job title?"
+
+SURVEY_ANSWERS = {
+    JOB_TITLE_QUESTION: [
+        "Data Analyst",
+        "Data Scientist",
+        "Data Engineer",
+        "Machine Learning Engineer",
+        "BI Developer",
+    ],
+    YEARS_OF_EXPERIENCE_QUSTION: YEARS_OF_EXPERIENCE_ANSWERS,
+    "In which region do you work?": [
+        "Hovedstaden",
+        "Midtjylland",
+        "Syddanmark",
+        "Sjælland",
+        "Nordjylland",
+    ],
+    "What is your highest completed education?": [
+        "Bachelor",
+        "Master",
+        "PhD",
+        "Other",
+    ],
+}
+
+SURVEY_YEARS = [2022, 2023, 2024]
+
+NUMBER_OF_EVENTS = 12
+# how far back the synthetic users, members and registrations are spread
+HISTORY = timedelta(days=3 * 365)
+
+BATCH_SIZE = 10000
+
+
+class Command(BaseCommand):
+    help = (
+        "Time the stats queries and views on synthetic data, cold and warm, and "
+        "print the results as JSON. The synthetic rows are rolled back after each "
+        "scale, but they are added to the existing rows while measuring, so run it "
+        "against an empty database to compare results across commits."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--rows",
+            type=int,
+            action="append",
+            help=(
+                "Number of survey answers to generate, can be repeated to benchmark "
+                "several scales, e.g. --rows=10000 --rows=100000 --rows=1000000"
+            ),
+        )
+        parser.add_argument(
+            "--users",
+            type=int,
+            default=1000,
+            help="Number of users to generate, half of them members",
+        )
+        parser.add_argument(
+            "--repeat",
+            type=int,
+            default=5,
+            help="Number of cold and of warm runs of each benchmark",
+        )
+        parser.add_argument(
+            "--seed", type=int, default=0, help="Seed of the synthetic data"
+        )
+        parser.add_argument(
+            "--host",
+            default="localhost",
+            help="Host of the benchmarked requests, must be in ALLOWED_HOSTS",
+        )
+        parser.add_argument("--output", type=str, help="Write the JSON to this file")
+
+    def handle(self, *args, **options):
+        if options["repeat"] < 1:
+            raise CommandError("--repeat must be at least 1")
+        self.verbosity = options["verbosity"]
+        self.client = Client(HTTP_HOST=options["host"])
+
+        scales = []
+        for rows in options["rows"] or [10000]:
+            scales.append(
+                self.__benchmark_scale(
+                    rows, options["users"], options["repeat"], options["seed"]
+                )
+            )
+        results = {
+            "database": connection.vendor,
+            "numpy_engine": settings.STATS_USE_NUMPY_ENGINE,
+            "seed": options["seed"],
+            "repeat": options["repeat"],
+            "scales": scales,
+        }
+
+        output = json.dumps(results, indent=2)
+        if options["output"]:
+            Path(options["output"]).write_text(output + "\n")
+        else:
+            self.stdout.write(output)
+
+    def __benchmark_scale(self, rows: int, users: int, repeat: int, seed: int):
+        self.__report(f"Generating {rows} survey answers and {users} users")
+        with transaction.atomic():
+            random_generator = random.Random(seed)
+            create_survey_answers(random_generator, rows)
+            create_users(random_generator, users)
+            rebuild_salary_aggregates()
+            call_command("backfill_monthly_counters", stdout=StringIO())
+
+            self.__report("Benchmarking")
+            results = {
+                name: benchmark(func, repeat)
+                for name, func in self.__get_benchmarks().items()
+            }
+            transaction.set_rollback(True)
+        # the results cached from the synthetic data must not be served afterwards
+        bump_cache_generation(SURVEY_CACHE_NAMESPACE)
+        return {"survey_rows": rows, "users": users, "results": results}
+
+    def __get_benchmarks(self) -> dict:
+        return {
+            "get_salary_stats_by_answer": lambda: get_salary_stats_by_answer(
+                JOB_TITLE_QUESTION, SURVEY_YEARS
+            ),
+            "get_object_stats_by_month": lambda: [
+                list(get_object_stats_by_month(*counted_model))
+                for counted_model in COUNTED_MODELS.values()
+            ],
+            "frequency_view": lambda: self.__get(reverse("stats:salary_survey")),
+            "stats_view": lambda: self.__get(reverse("stats:stats")),
+        }
+
+    def __get(self, url: str):
+        response = self.client.get(url)
+        if response.status_code != 200:
+            raise CommandError(f"GET {url} returned {response.status_code}")
+        return response
+
+    def __report(self, message: str):
+        if self.verbosity > 1:
+            self.stderr.write(message)
+
+
+def benchmark(func, repeat: int) -> dict:
+    """
+    Cold runs start from an invalidated survey cache, warm runs are served from
+    the cache filled by the run before them.
+    """
+    cold = []
+    for _ in range(repeat):
+        bump_cache_generation(SURVEY_CACHE_NAMESPACE)
+        cold.append(time_call(func))
+    warm = [time_call(func) for _ in range(repeat)]
+    return {"cold": summarize(cold), "warm": summarize(warm)}
+
+
+def time_call(func) -> float:
+    started = time.perf_counter()
+    func()
+    return time.perf_counter() - started
+
+
+def summarize(timings: list[float]) -> dict:
+    return {
+        "min_ms": round(min(timings) * 1000, 3),
+        "median_ms": round(statistics.median(timings) * 1000, 3),
+        "max_ms": round(max(timings) * 1000, 3),
+    }
+
+
+def create_survey_answers(random_generator: random.Random, rows: int):
+    """One answer to every question per respondent, spread over the survey years."""
+    writer = SurveyWriter()
+    records = iter_survey_records(random_generator, rows // len(SURVEY_ANSWERS))
+    for batch in batched(records, BATCH_SIZE):
+        writer.write(batch)
+
+
+def iter_survey_records(random_generator: random.Random, respondents: int):
+    now = timezone.now()
+    for user_id in range(respondents):
+        year = SURVEY_YEARS[user_id % len(SURVEY_YEARS)]
+        salary = random_generator.randrange(25000, 90000, 500)
+        for question, answers in SURVEY_ANSWERS.items():
+            yield {
+                "user_id": user_id,
+                "year": year,
+                "question": question,
+                "answer": random_generator.choice(answers),
+                "monthly_salary": salary,
+                "created_at": now,
+            }
+
+
+def create_users(random_generator: random.Random, users: int):
+    """
+    Users joined over the last years, every other one a member, each registered
+    to one event. Members and registrations are created when the user joined.
+    """
+    now = timezone.now()
+    first_id = User.objects.count()
+    created_users = User.objects.bulk_create(
+        (
+            User(
+                email=f"benchmark-{first_id + i}@example.com",
+                date_joined=now - HISTORY * random_generator.random(),
+            )
+            for i in range(users)
+        ),
+        batch_size=BATCH_SIZE,
+    )
+    created_users = User.objects.filter(
+        email__in=[user.email for user in created_users]
+    )
+    events = [
+        Event.objects.create(
+            title=f"Benchmark event {first_id}-{i}",
+            signup_type=Event.SignupTypeChoice.DDSC_SIGNUP,
+            location="Copenhagen",
+            start_datetime=now,
+            end_datetime=now,
+            summary="Benchmark",
+            description="Benchmark",
+            maximum_attendees=users,
+        )
+        for i in range(NUMBER_OF_EVENTS)
+    ]
+
+    user_ids = list(created_users.values_list("id", flat=True))
+    Member.objects.bulk_create(
+        (Member(user_id=user_id) for user_id in user_ids[::2]),
+        batch_size=BATCH_SIZE,
+    )
+    EventRegistration.objects.bulk_create(
+        (
+            EventRegistration(event=random_generator.choice(events), user_id=user_id)
+            for user_id in user_ids
+        ),
+        batch_size=BATCH_SIZE,
+    )
+
+    date_joined = Subquery(
+        User.objects.filter(id=OuterRef("user_id")).values("date_joined")[:1]
+    )
+    Member.objects.filter(user__in=created_users).update(created=date_joined)
+    EventRegistration.objects.filter(user__in=created_users).update(created=date_joined)
@@ -1,52 +1,161 @@
-from django.core.management.base import BaseCommand
-from django.db import transaction
-from stats.models import SurveyData
-from datetime import datetime
-from django.utils.timezone import make_aware
-import json
+import time
+from itertools import islice
+from pathlib import Path
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import IntegrityError, transaction
+from stats.decorators import bump_cache_generation
+from stats.models import SURVEY_CACHE_NAMESPACE, SurveyDataLoad, SurveyRespondent
+from stats.survey_files import SurveyWriter, batched, open_survey_records
+
+SURVEY_FILE_FORMATS = ["json", "parquet"]
 
 
 class Command(BaseCommand):
-    help = "Load data from a JSON file into SurveyData model"
+    help = (
+        "Load data from a JSON or Parquet file into the survey tables. The file is "
+        "streamed and committed in batches, and an interrupted load of the same file "
+        "resumes after the last committed batch."
+    )
 
     def add_arguments(self, parser):
-        parser.add_argument("file_path", type=str, help="Path to the JSON file")
+        parser.add_argument(
+            "file_path", type=str, help="Path to the JSON or Parquet file"
+        )
         parser.add_argument(
             "--batch_size",
             type=int,
             default=1000,
             help="Number of records to insert in a batch",
         )
+        parser.add_argument(
+            "--format",
+            choices=SURVEY_FILE_FORMATS,
+            help="File format, by default taken from the file extension",
+        )
+        parser.add_argument(
+            "--upsert",
+            action="store_true",
+            help="Update answers that are already loaded instead of failing",
+        )
+        parser.add_argument(
+            "--replace-year",
+            type=int,
+            action="append",
+            dest="replace_years",
+            help=(
+                "Replace all answers of the year with those in the file in one "
+                "transaction, can be repeated"
+            ),
+        )
 
-    @transaction.atomic
     def handle(self, *args, **options):
-        file_path = options["file_path"]
+        file_path = Path(options["file_path"])
         batch_size = options["batch_size"]
+        file_format = options["format"] or file_path.suffix.lstrip(".").lower()
+        self.__check_file_format(file_format)
+        self.writer = SurveyWriter(upsert=options["upsert"])
+        self.verbosity = options["verbosity"]
 
-        with open(file_path, "r") as file:
-            data = json.load(file)
+        with open_survey_records(file_path, file_format, batch_size) as records:
+            if options["replace_years"]:
+                years = set(options["replace_years"])
+                loaded, elapsed = self.__replace_years(records, years, batch_size)
+            else:
+                years = set()
+                loaded, elapsed = self.__load_resumable(
+                    file_path, records, years, batch_size
+                )
 
-        total_records = len(data)
+        bump_cache_generation(SURVEY_CACHE_NAMESPACE)
+        call_command(
+            "rebuild_salary_aggregates",
+            *[f"--year={year}" for year in sorted(years)],
+            stdout=self.stdout,
+        )
+        rows_per_second = loaded / elapsed if elapsed else loaded
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Data successfully loaded from "{file_path}": {loaded} rows in '
+                f"{elapsed:.1f}s ({rows_per_second:.0f} rows/s)"
+            )
+        )
 
-        for start in range(0, total_records, batch_size):
-            end = start + batch_size
+    def __load_resumable(
+        self, file_path: Path, records, years: set[int], batch_size: int
+    ):
+        """Commit each batch together with a checkpoint of the rows loaded so far."""
+        checkpoint = self.__get_checkpoint(file_path)
+        for record in islice(records, checkpoint.rows_loaded):
+            years.add(record["year"])
 
-            records_to_insert = [
-                self.__create_surveydata_record(record) for record in data[start:end]
-            ]
+        started = time.monotonic()
+        loaded = 0
+        for batch in batched(records, batch_size):
+            years.update(record["year"] for record in batch)
+            with transaction.atomic():
+                self.__insert(batch)
+                checkpoint.rows_loaded += len(batch)
+                checkpoint.save(update_fields=["rows_loaded", "updated"])
+            loaded += len(batch)
+            self.__report_progress(checkpoint.rows_loaded)
 
-            SurveyData.objects.bulk_create(records_to_insert)
+        checkpoint.finished = True
+        checkpoint.save(update_fields=["finished", "updated"])
+        return loaded, time.monotonic() - started
 
-        self.stdout.write(
-            self.style.SUCCESS('Data successfully loaded from "{}"'.format(file_path))
-        )
+    @transaction.atomic
+    def __replace_years(self, records, years: set[int], batch_size: int):
+        """Swap the rows of the given years for those in the file in one transaction."""
+        started = time.monotonic()
+        SurveyRespondent.objects.filter(year__in=years).delete()
+        loaded = 0
+        records = (record for record in records if record["year"] in years)
+        for batch in batched(records, batch_size):
+            self.__insert(batch)
+            loaded += len(batch)
+            self.__report_progress(loaded)
+        return loaded, time.monotonic() - started
+
+    def __insert(self, batch: list[dict]):
+        try:
+            with transaction.atomic():
+                self.writer.write(batch)
+        except IntegrityError:
+            raise CommandError(
+                "The file contains answers that are already loaded, "
+                "use --upsert or --replace-year to load it again"
+            )
 
-    def __create_surveydata_record(self, record):
-        return SurveyData(
-            user_id=record["user_id"],
-            question=record["question"],
-            answer=record["answer"],
-            year=record["year"],
-            monthly_salary=record["monthly_salary"],
-            created_at=make_aware(datetime.fromisoformat(record["created_at"])),
+    def __report_progress(self, rows_loaded: int):
+        if self.verbosity > 1:
+            self.stdout.write(f"{rows_loaded} rows loaded")
+
+    def __get_checkpoint(self, file_path: Path) -> SurveyDataLoad:
+        checkpoint, _ = SurveyDataLoad.objects.get_or_create(
+            file_name=file_path.name,
+            file_size=file_path.stat().st_size,
         )
+        if checkpoint.finished:
+            checkpoint.rows_loaded = 0
+            checkpoint.finished = False
+            checkpoint.save()
+        elif checkpoint.rows_loaded:
+            self.stdout.write(
+                self.style.WARNING(
+                    f"Resuming an interrupted load after row {checkpoint.rows_loaded}"
+                )
+            )
+        return checkpoint
+
+    def __check_file_format(self, file_format: str):
+        if file_format not in SURVEY_FILE_FORMATS:
+            raise CommandError(f"Unsupported file format '{file_format}'")
+        if file_format == "parquet":
+            try:
+                import pyarrow  # noqa: F401
+            except ImportError:
+                raise CommandError(
+                    "Loading Parquet files requires pyarrow, install the 'survey' extra"
+                )
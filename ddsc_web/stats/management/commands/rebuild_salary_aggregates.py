@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from stats.aggregates import rebuild_salary_aggregates
+
+
+class Command(BaseCommand):
+    help = "Rebuild the precomputed salary statistics from the survey answers"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--year",
+            type=int,
+            action="append",
+            dest="years",
+            help="Only rebuild the given year, can be repeated",
+        )
+
+    def handle(self, *args, **options):
+        years = options["years"]
+        created = rebuild_salary_aggregates(years)
+        rebuilt = ", ".join(map(str, years)) if years else "all years"
+        self.stdout.write(
+            self.style.SUCCESS(f"Rebuilt {created} salary aggregates for {rebuilt}")
+        )
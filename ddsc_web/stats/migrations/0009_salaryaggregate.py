@@ -0,0 +1,44 @@
+# Generated by Django 4.1.5 on 2026-10-18 12:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("stats", "0008_alter_surveydata_monthly_salary"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="SalaryAggregate",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("question", models.CharField(max_length=750)),
+                ("year", models.IntegerField()),
+                ("answer", models.TextField()),
+                ("count", models.IntegerField()),
+                ("total", models.BigIntegerField()),
+                ("minimum", models.IntegerField()),
+                ("maximum", models.IntegerField()),
+                ("salaries", models.JSONField(default=list)),
+            ],
+            options={
+                "ordering": ["year", "question"],
+            },
+        ),
+        migrations.AddIndex(
+            model_name="salaryaggregate",
+            index=models.Index(
+                fields=["question", "year"], name="stats_salar_questio_27046f_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 4.1.5 on 2026-10-18 12:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("stats", "0009_salaryaggregate"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="SurveyDataLoad",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("file_name", models.CharField(max_length=255)),
+                ("file_size", models.BigIntegerField()),
+                ("rows_loaded", models.BigIntegerField(default=0)),
+                ("finished", models.BooleanField(default=False)),
+                ("updated", models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name="surveydataload",
+            constraint=models.UniqueConstraint(
+                fields=("file_name", "file_size"), name="unique_survey_data_load"
+            ),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 4.1.5 on 2026-10-18 12:19
+
+from django.db import migrations, models
+from django.db.models import Count, Min
+
+
+def delete_duplicate_answers(apps, schema_editor):
+    SurveyData = apps.get_model("stats", "SurveyData")
+    duplicates = (
+        SurveyData.objects.values("year", "user_id", "question")
+        .annotate(first_id=Min("id"), rows=Count("id"))
+        .filter(rows__gt=1)
+        .order_by()
+    )
+    for duplicate in duplicates:
+        SurveyData.objects.filter(
+            year=duplicate["year"],
+            user_id=duplicate["user_id"],
+            question=duplicate["question"],
+        ).exclude(id=duplicate["first_id"]).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("stats", "0010_surveydataload"),
+    ]
+
+    operations = [
+        migrations.RunPython(delete_duplicate_answers, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name="surveydata",
+            constraint=models.UniqueConstraint(
+                fields=("year", "user_id", "question"), name="unique_survey_answer"
+            ),
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 4.1.5 on 2026-10-18 12:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("stats", "0011_surveydata_unique_answer"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="MonthlyCounter",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("name", models.CharField(max_length=50)),
+                ("month", models.DateField()),
+                ("total", models.IntegerField(default=0)),
+            ],
+            options={
+                "ordering": ["name", "month"],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="monthlycounter",
+            constraint=models.UniqueConstraint(
+                fields=("name", "month"), name="unique_monthly_counter"
+            ),
+        ),
+    ]
@@ -0,0 +1,175 @@
+# Generated by Django 4.1.5 on 2026-10-18 12:27
+
+from django.db import migrations, models
+from django.db.models import Max, Min
+import django.db.models.deletion
+
+BATCH_SIZE = 10000
+
+
+def copy_survey_data(apps, schema_editor):
+    SurveyData = apps.get_model("stats", "SurveyData")
+    SurveyQuestion = apps.get_model("stats", "SurveyQuestion")
+    SurveyRespondent = apps.get_model("stats", "SurveyRespondent")
+    SurveyAnswer = apps.get_model("stats", "SurveyAnswer")
+
+    questions = SurveyData.objects.order_by().values_list("question", flat=True)
+    SurveyQuestion.objects.bulk_create(
+        SurveyQuestion(text=text) for text in questions.distinct()
+    )
+    respondents = (
+        SurveyData.objects.values("year", "user_id")
+        .annotate(salary=Max("monthly_salary"), first_created=Min("created_at"))
+        .order_by()
+    )
+    SurveyRespondent.objects.bulk_create(
+        (
+            SurveyRespondent(
+                year=respondent["year"],
+                user_id=respondent["user_id"],
+                monthly_salary=respondent["salary"],
+                created_at=respondent["first_created"],
+            )
+            for respondent in respondents.iterator(chunk_size=BATCH_SIZE)
+        ),
+        batch_size=BATCH_SIZE,
+    )
+
+    question_ids = dict(SurveyQuestion.objects.values_list("text", "id"))
+    respondent_ids = {
+        (year, user_id): id
+        for year, user_id, id in SurveyRespondent.objects.values_list(
+            "year", "user_id", "id"
+        )
+    }
+    rows = SurveyData.objects.order_by().values_list(
+        "question", "year", "user_id", "answer"
+    )
+    SurveyAnswer.objects.bulk_create(
+        (
+            SurveyAnswer(
+                question_id=question_ids[question],
+                respondent_id=respondent_ids[year, user_id],
+                answer=answer,
+            )
+            for question, year, user_id, answer in rows.iterator(
+                chunk_size=BATCH_SIZE
+            )
+        ),
+        batch_size=BATCH_SIZE,
+    )
+
+
+def copy_survey_answers_back(apps, schema_editor):
+    SurveyData = apps.get_model("stats", "SurveyData")
+    SurveyAnswer = apps.get_model("stats", "SurveyAnswer")
+
+    SurveyData.objects.all().delete()
+    rows = SurveyAnswer.objects.order_by().values_list(
+        "question__text",
+        "respondent__year",
+        "respondent__user_id",
+        "answer",
+        "respondent__monthly_salary",
+        "respondent__created_at",
+    )
+    SurveyData.objects.bulk_create(
+        (
+            SurveyData(
+                question=question,
+                year=year,
+                user_id=user_id,
+                answer=answer,
+                monthly_salary=monthly_salary,
+                created_at=created_at,
+            )
+            for question, year, user_id, answer, monthly_salary, created_at in (
+                rows.iterator(chunk_size=BATCH_SIZE)
+            )
+        ),
+        batch_size=BATCH_SIZE,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("stats", "0012_monthlycounter"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="SurveyAnswer",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("answer", models.TextField(blank=True, null=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name="SurveyQuestion",
+            fields=[
+                ("id", models.SmallAutoField(primary_key=True, serialize=False)),
+                ("text", models.CharField(max_length=750, unique=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name="SurveyRespondent",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("user_id", models.IntegerField()),
+                ("year", models.SmallIntegerField(db_index=True)),
+                ("monthly_salary", models.IntegerField(blank=True, null=True)),
+                ("created_at", models.DateTimeField()),
+            ],
+            options={
+                "ordering": ["year", "user_id"],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="surveyrespondent",
+            constraint=models.UniqueConstraint(
+                fields=("year", "user_id"), name="unique_survey_respondent"
+            ),
+        ),
+        migrations.AddField(
+            model_name="surveyanswer",
+            name="question",
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.PROTECT,
+                related_name="answers",
+                to="stats.surveyquestion",
+            ),
+        ),
+        migrations.AddField(
+            model_name="surveyanswer",
+            name="respondent",
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="answers",
+                to="stats.surveyrespondent",
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="surveyanswer",
+            constraint=models.UniqueConstraint(
+                fields=("question", "respondent"), name="unique_respondent_answer"
+            ),
+        ),
+        migrations.RunPython(copy_survey_data, copy_survey_answers_back),
+    ]
@@ -0,0 +1,84 @@
+# Generated by Django 4.1.5 on 2026-10-18 12:43
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def link_questions(apps, schema_editor):
+    SalaryAggregate = apps.get_model("stats", "SalaryAggregate")
+    SurveyQuestion = apps.get_model("stats", "SurveyQuestion")
+
+    texts = SalaryAggregate.objects.order_by().values_list("question_text", flat=True)
+    SurveyQuestion.objects.bulk_create(
+        [SurveyQuestion(text=text) for text in texts.distinct()],
+        ignore_conflicts=True,
+    )
+    for question_id, text in SurveyQuestion.objects.values_list("id", "text"):
+        SalaryAggregate.objects.filter(question_text=text).update(
+            question_id=question_id
+        )
+
+
+def unlink_questions(apps, schema_editor):
+    SalaryAggregate = apps.get_model("stats", "SalaryAggregate")
+    SurveyQuestion = apps.get_model("stats", "SurveyQuestion")
+
+    for question_id, text in SurveyQuestion.objects.values_list("id", "text"):
+        SalaryAggregate.objects.filter(question_id=question_id).update(
+            question_text=text
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("stats", "0013_survey_question_respondent_answer"),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name="salaryaggregate",
+            name="stats_salar_questio_27046f_idx",
+        ),
+        migrations.RenameField(
+            model_name="salaryaggregate",
+            old_name="question",
+            new_name="question_text",
+        ),
+        migrations.AddField(
+            model_name="salaryaggregate",
+            name="question",
+            field=models.ForeignKey(
+                null=True,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="salary_aggregates",
+                to="stats.surveyquestion",
+            ),
+        ),
+        # nullable, so migrating backwards can add it back empty before filling it
+        migrations.AlterField(
+            model_name="salaryaggregate",
+            name="question_text",
+            field=models.CharField(max_length=750, null=True),
+        ),
+        migrations.RunPython(link_questions, unlink_questions),
+        migrations.RemoveField(
+            model_name="salaryaggregate",
+            name="question_text",
+        ),
+        migrations.AlterField(
+            model_name="salaryaggregate",
+            name="question",
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="salary_aggregates",
+                to="stats.surveyquestion",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="salaryaggregate",
+            index=models.Index(
+                fields=["question", "year"], name="stats_salar_questio_483f48_idx"
+            ),
+        ),
+    ]
@@ -1,12 +1,72 @@
 from django.db import models
 
 
+# results cached from survey data, invalidated whenever the data changes
+SURVEY_CACHE_NAMESPACE = "survey_data"
+
+
+class SurveyQuestion(models.Model):
+    id = models.SmallAutoField(primary_key=True)
+    text = models.CharField(max_length=750, unique=True)
+
+    def __str__(self):
+        return self.text
+
+
+class SurveyRespondent(models.Model):
+    """One answered survey, holding what is shared by all of its answers."""
+
+    class Meta:
+        ordering = ["year", "user_id"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["year", "user_id"], name="unique_survey_respondent"
+            ),
+        ]
+
+    # id of the respondent in the survey export
+    user_id = models.IntegerField()
+    year = models.SmallIntegerField(db_index=True)
+    monthly_salary = models.IntegerField(null=True, blank=True)
+    created_at = models.DateTimeField()
+
+
+class SurveyAnswer(models.Model):
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["question", "respondent"], name="unique_respondent_answer"
+            ),
+        ]
+
+    question = models.ForeignKey(
+        SurveyQuestion, on_delete=models.PROTECT, related_name="answers"
+    )
+    respondent = models.ForeignKey(
+        SurveyRespondent, on_delete=models.CASCADE, related_name="answers"
+    )
+    answer = models.TextField(null=True, blank=True)
+
+
 class SurveyData(models.Model):
+    """
+    Former storage of one row per respondent and question, superseded by the
+    tables above and no longer read or written. It is kept so the normalizing
+    migration can be rolled back, and dropped in a later release once the new
+    tables are verified in production.
+    """
+
     class Meta:
         ordering = ["year", "question"]
         indexes = [
             models.Index(fields=["question", "year"]),
         ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["year", "user_id", "question"],
+                name="unique_survey_answer",
+            ),
+        ]
 
     user_id = models.IntegerField(null=False, blank=False)
     question = models.CharField(max_length=750, db_index=True)
@@ -14,3 +74,61 @@ class SurveyData(models.Model):
     year = models.IntegerField(db_index=True)
     monthly_salary = models.IntegerField(null=True, blank=True)
     created_at = models.DateTimeField()
+
+
+class SalaryAggregate(models.Model):
+    """
+    Salary statistics of one answer to a question in one survey year. Rebuilt from
+    the survey answers by the rebuild_salary_aggregates command.
+    """
+
+    class Meta:
+        ordering = ["year", "question"]
+        indexes = [
+            models.Index(fields=["question", "year"]),
+        ]
+
+    question = models.ForeignKey(
+        SurveyQuestion, on_delete=models.CASCADE, related_name="salary_aggregates"
+    )
+    year = models.IntegerField()
+    answer = models.TextField()
+    count = models.IntegerField()
+    total = models.BigIntegerField()
+    minimum = models.IntegerField()
+    maximum = models.IntegerField()
+    # every salary in ascending order, so medians over several years stay exact
+    salaries = models.JSONField(default=list)
+
+
+class SurveyDataLoad(models.Model):
+    """Checkpoint of a load_survey_data run, so a failed load can be resumed."""
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["file_name", "file_size"], name="unique_survey_data_load"
+            ),
+        ]
+
+    file_name = models.CharField(max_length=255)
+    file_size = models.BigIntegerField()
+    rows_loaded = models.BigIntegerField(default=0)
+    finished = models.BooleanField(default=False)
+    updated = models.DateTimeField(auto_now=True)
+
+
+class MonthlyCounter(models.Model):
+    """Number of objects created in a month, kept up to date by signals."""
+
+    class Meta:
+        ordering = ["name", "month"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["name", "month"], name="unique_monthly_counter"
+            ),
+        ]
+
+    name = models.CharField(max_length=50)
+    month = models.DateField()
+    total = models.IntegerField(default=0)
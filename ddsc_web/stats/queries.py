@@ -1,10 +1,18 @@
 from django.apps import apps
+from django.conf import settings
 from django.db.models import Avg, Case, Count, Func, Max, Min, QuerySet, When
 from django.db.models.expressions import RawSQL
 from django.db.models.functions import TruncMonth
 
+from .aggregates import (
+    MINIMUM_ANSWER_COUNT,
+    combine_salary_aggregates,
+    get_salary_answers,
+    get_salary_rows,
+    iter_salary_aggregates,
+)
 from .decorators import cache_query_result
-from .models import SurveyData
+from .models import SURVEY_CACHE_NAMESPACE, SalaryAggregate
 
 YEARS_OF_EXPERIENCE_QUSTION = (
     "How many years of relevant full-time work experience do you have?"
@@ -29,6 +37,8 @@ YEARS_OF_EXPERIENCE_ANSWERS = [
     "15+",
 ]
 
+SALARY_STATS_FIELDS = ["answer", "count", "average", "min", "max", "median"]
+
 
 class Round(Func):
     function = "ROUND"
@@ -56,30 +66,67 @@ def get_object_stats_by_month(
     )
 
 
-@cache_query_result(timeout=60 * 60 * 24)
-def get_salary_stats_by_answer(question: str, years: list[int]) -> QuerySet:
-    queryset = (
-        SurveyData.objects.filter(
-            question=question,
-            year__in=years,
-            answer__isnull=False,
-            monthly_salary__isnull=False,
-            monthly_salary__gt=0,
+@cache_query_result(timeout=60 * 60 * 24, namespace=SURVEY_CACHE_NAMESPACE)
+def get_salary_stats_by_answer(question: str, years: list[int]) -> list[dict]:
+    """
+    Served from the precomputed SalaryAggregate rows, falling back to aggregating
+    the survey answers when they have not been built yet. Years loaded without
+    rebuilding their aggregates are aggregated from their answers in memory. With
+    STATS_USE_NUMPY_ENGINE the in-memory survey engine computes them instead.
+    """
+    if settings.STATS_USE_NUMPY_ENGINE:
+        from .engine import get_survey_engine
+
+        rows = get_survey_engine().get_salary_stats_by_answer(question, years)
+        return order_salary_stats(question, rows)
+
+    aggregates = list(
+        SalaryAggregate.objects.filter(question__text=question, year__in=years)
+    )
+    if not aggregates:
+        return list(get_salary_stats_by_answer_from_answers(question, years))
+    missing_years = set(years) - {aggregate.year for aggregate in aggregates}
+    if missing_years:
+        aggregates += iter_salary_aggregates(
+            get_salary_rows(sorted(missing_years), question)
         )
-        .exclude(answer="")
+    return order_salary_stats(question, combine_salary_aggregates(aggregates))
+
+
+def order_salary_stats(question: str, rows: list[dict]) -> list[dict]:
+    if question == YEARS_OF_EXPERIENCE_QUSTION:
+        positions = {
+            answer: position
+            for position, answer in enumerate(YEARS_OF_EXPERIENCE_ANSWERS)
+        }
+        return sorted(
+            rows, key=lambda row: positions.get(row["answer"], len(positions))
+        )
+    else:
+        return sorted(rows, key=lambda row: row["median"], reverse=True)
+
+
+def get_salary_stats_by_answer_from_answers(
+    question: str, years: list[int]
+) -> QuerySet:
+    queryset = (
+        get_salary_answers(years)
+        .filter(question__text=question)
         .values("answer")
         .annotate(
-            count=Count("user_id"),
+            count=Count("respondent_id"),
             average=Round(
-                Avg("monthly_salary"),
+                Avg("respondent__monthly_salary"),
             ),
-            min=Min("monthly_salary"),
-            max=Max("monthly_salary"),
+            min=Min("respondent__monthly_salary"),
+            max=Max("respondent__monthly_salary"),
             median=RawAnnotation(
-                "percentile_disc(%s) WITHIN GROUP (ORDER BY monthly_salary)", (0.5,)
+                "percentile_disc(%s) WITHIN GROUP "
+                '(ORDER BY "stats_surveyrespondent"."monthly_salary")',
+                (0.5,),
             ),
         )
-        .filter(count__gt=5)
+        .filter(count__gt=MINIMUM_ANSWER_COUNT)
     )
     if question == YEARS_OF_EXPERIENCE_QUSTION:
         return queryset.order_by(
@@ -0,0 +1,48 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .counters import COUNTED_MODELS, add_to_monthly_counter
+from .decorators import bump_cache_generation
+from .models import (
+    SURVEY_CACHE_NAMESPACE,
+    SurveyAnswer,
+    SurveyQuestion,
+    SurveyRespondent,
+)
+
+
+# Bulk loads and deletes bump the generation themselves. A post_delete receiver
+# would make Django fetch every row before deleting a year of survey data.
+@receiver(post_save, sender=SurveyQuestion)
+@receiver(post_save, sender=SurveyRespondent)
+@receiver(post_save, sender=SurveyAnswer)
+def invalidate_survey_data_cache(sender, **kwargs):
+    transaction.on_commit(lambda: bump_cache_generation(SURVEY_CACHE_NAMESPACE))
+
+
+def connect_monthly_counter(name: str, app_name: str, model_name: str, date_field: str):
+    def count_created(sender, instance, created, **kwargs):
+        if created:
+            add_to_monthly_counter(name, getattr(instance, date_field), 1)
+
+    def count_deleted(sender, instance, **kwargs):
+        add_to_monthly_counter(name, getattr(instance, date_field), -1)
+
+    sender = f"{app_name}.{model_name}"
+    post_save.connect(
+        count_created,
+        sender=sender,
+        weak=False,
+        dispatch_uid=f"monthly_counter_created:{name}",
+    )
+    post_delete.connect(
+        count_deleted,
+        sender=sender,
+        weak=False,
+        dispatch_uid=f"monthly_counter_deleted:{name}",
+    )
+
+
+for name, counted_model in COUNTED_MODELS.items():
+    connect_monthly_counter(name, *counted_model)
@@ -0,0 +1,146 @@
+import json
+import re
+from contextlib import contextmanager
+from datetime import datetime
+from itertools import islice
+from pathlib import Path
+from typing import IO, Iterable, Iterator
+
+from django.utils.timezone import is_aware, make_aware
+
+from .models import SurveyAnswer, SurveyQuestion, SurveyRespondent
+
+# Characters read from a JSON export at a time
+JSON_READ_SIZE = 64 * 1024
+WHITESPACE = re.compile(r"\s*")
+
+
+def iter_json_records(file: IO[str], read_size: int = JSON_READ_SIZE) -> Iterator[dict]:
+    """
+    Parse a row-oriented JSON export one record at a time, so memory use does not
+    grow with the size of the file.
+    """
+    decoder = json.JSONDecoder()
+    buffer = file.read(read_size).lstrip()
+    if not buffer.startswith("["):
+        raise ValueError("Expected a JSON array of survey records")
+    # the records before index are parsed, they are only cut off when reading more
+    index = 1
+    end_of_file = False
+
+    while True:
+        start = WHITESPACE.match(buffer, index).end()
+        if buffer.startswith(",", start):
+            start = WHITESPACE.match(buffer, start + 1).end()
+        if buffer.startswith("]", start):
+            return
+        try:
+            record, index = decoder.raw_decode(buffer, start)
+        except json.JSONDecodeError:
+            if end_of_file:
+                raise
+            chunk = file.read(read_size)
+            end_of_file = not chunk
+            buffer = buffer[index:] + chunk
+            index = 0
+            continue
+        yield record
+
+
+def iter_parquet_records(path: Path, batch_size: int) -> Iterator[dict]:
+    """Read the Parquet file written by salary_survey/preprocessor.py in batches."""
+    import pyarrow.parquet as pq
+
+    parquet_file = pq.ParquetFile(path)
+    for batch in parquet_file.iter_batches(batch_size=batch_size):
+        yield from batch.to_pylist()
+
+
+@contextmanager
+def open_survey_records(path: Path, file_format: str, batch_size: int):
+    if file_format == "json":
+        with open(path, "r") as file:
+            yield iter_json_records(file)
+    elif file_format == "parquet":
+        yield iter_parquet_records(path, batch_size)
+    else:
+        raise ValueError(f"Unsupported file format '{file_format}'")
+
+
+def batched(records: Iterable, size: int) -> Iterator[list]:
+    records = iter(records)
+    while batch := list(islice(records, size)):
+        yield batch
+
+
+def to_datetime(value: str | datetime) -> datetime:
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    return value if is_aware(value) else make_aware(value)
+
+
+class SurveyWriter:
+    """
+    Writes export records, one per respondent and question, into the normalized
+    survey tables. Respondents are upserted, as their records can span batches.
+    """
+
+    def __init__(self, upsert: bool = False):
+        self.upsert = upsert
+        self.question_ids: dict[str, int] = {}
+
+    def write(self, records: list[dict]):
+        question_ids = self.get_question_ids({r["question"] for r in records})
+        respondent_ids = self.get_respondent_ids(records)
+        answers = [
+            SurveyAnswer(
+                question_id=question_ids[record["question"]],
+                respondent_id=respondent_ids[record["year"], record["user_id"]],
+                answer=record["answer"],
+            )
+            for record in records
+        ]
+        if self.upsert:
+            SurveyAnswer.objects.bulk_create(
+                answers,
+                update_conflicts=True,
+                unique_fields=["question", "respondent"],
+                update_fields=["answer"],
+            )
+        else:
+            SurveyAnswer.objects.bulk_create(answers)
+
+    def get_question_ids(self, texts: set[str]) -> dict[str, int]:
+        missing = texts - self.question_ids.keys()
+        if missing:
+            SurveyQuestion.objects.bulk_create(
+                [SurveyQuestion(text=text) for text in missing], ignore_conflicts=True
+            )
+            self.question_ids.update(
+                SurveyQuestion.objects.filter(text__in=missing).values_list(
+                    "text", "id"
+                )
+            )
+        return self.question_ids
+
+    def get_respondent_ids(self, records: list[dict]) -> dict[tuple[int, int], int]:
+        respondents = {
+            (record["year"], record["user_id"]): SurveyRespondent(
+                year=record["year"],
+                user_id=record["user_id"],
+                monthly_salary=record["monthly_salary"],
+                created_at=to_datetime(record["created_at"]),
+            )
+            for record in records
+        }
+        SurveyRespondent.objects.bulk_create(
+            respondents.values(),
+            update_conflicts=True,
+            unique_fields=["year", "user_id"],
+            update_fields=["monthly_salary", "created_at"],
+        )
+        years, user_ids = zip(*respondents)
+        rows = SurveyRespondent.objects.filter(
+            year__in=set(years), user_id__in=set(user_ids)
+        ).values_list("year", "user_id", "id")
+        return {(year, user_id): id for year, user_id, id in rows}
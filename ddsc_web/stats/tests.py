@@ -1,3 +1,487 @@
-from django.test import TestCase
+import importlib.util
+import math
+import json
+import random
+import tempfile
+import threading
+import time
+from decimal import Decimal
+from io import StringIO
+from pathlib import Path
+from unittest import skipUnless
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from .aggregates import rebuild_salary_aggregates
+from .counters import get_month
+from .decorators import bump_cache_generation, cache_query_result, make_cache_key
+from .forms import get_question_choices
+from .models import (
+    SURVEY_CACHE_NAMESPACE,
+    MonthlyCounter,
+    SalaryAggregate,
+    SurveyAnswer,
+    SurveyDataLoad,
+    SurveyQuestion,
+    SurveyRespondent,
+)
+from .queries import (
+    YEARS_OF_EXPERIENCE_QUSTION,
+    get_salary_stats_by_answer,
+)
+from .survey_files import SurveyWriter, iter_json_records
+from users.models import User
+
+QUESTION = "What is your job title?"
+
+
+def create_answers(question: str, year: int, answer: str, salaries: list[int]):
+    first_user_id = SurveyRespondent.objects.count()
+    SurveyWriter().write(
+        [
+            {
+                "user_id": first_user_id + i,
+                "question": question,
+                "answer": answer,
+                "year": year,
+                "monthly_salary": salary,
+                "created_at": timezone.now(),
+            }
+            for i, salary in enumerate(salaries)
+        ]
+    )
+
+
+class SalaryAggregateTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        create_answers(QUESTION, 2022, "Analyst", [30000, 32000, 34000, 36000])
+        create_answers(QUESTION, 2023, "Analyst", [31000, 33000, 35001])
+        create_answers(QUESTION, 2023, "Engineer", [40000, 41000, 42000, 43000])
+        create_answers(QUESTION, 2023, "Engineer", [0, None])
+        create_answers(QUESTION, 2023, "", [50000] * 6)
+        create_answers(QUESTION, 2022, "Engineer", [44000, 45000])
+
+    def test_rebuild_creates_one_row_per_question_year_and_answer(self):
+        self.assertEqual(rebuild_salary_aggregates(), 4)
+        aggregate = SalaryAggregate.objects.get(year=2023, answer="Engineer")
+        self.assertEqual((aggregate.question.text, aggregate.count), (QUESTION, 4))
+        self.assertEqual(aggregate.salaries, [40000, 41000, 42000, 43000])
+
+        self.assertEqual(rebuild_salary_aggregates(years=[2022]), 2)
+        self.assertEqual(SalaryAggregate.objects.count(), 4)
+
+    def test_years_are_combined_with_exact_medians(self):
+        rebuild_salary_aggregates()
+        rows = get_salary_stats_by_answer(QUESTION, [2022, 2023])
+
+        self.assertEqual(
+            rows,
+            [
+                {
+                    "answer": "Engineer",
+                    "count": 6,
+                    "average": Decimal(42500),
+                    "min": 40000,
+                    "max": 45000,
+                    "median": 42000,
+                },
+                {
+                    "answer": "Analyst",
+                    "count": 7,
+                    "average": Decimal(33000),
+                    "min": 30000,
+                    "max": 36000,
+                    "median": 33000,
+                },
+            ],
+        )
+
+    def test_years_without_aggregates_are_computed_from_the_answers(self):
+        rebuild_salary_aggregates()
+        combined = get_salary_stats_by_answer(QUESTION, [2022, 2023])
+        SalaryAggregate.objects.filter(year=2023).delete()
+        cache.clear()
+
+        self.assertEqual(get_salary_stats_by_answer(QUESTION, [2022, 2023]), combined)
+
+    def test_answers_with_few_respondents_are_left_out(self):
+        rebuild_salary_aggregates()
+        self.assertEqual(get_salary_stats_by_answer(QUESTION, [2023]), [])
+
+    def test_years_of_experience_are_ordered_by_answer(self):
+        for years in ["10", "2", "15+"]:
+            create_answers(YEARS_OF_EXPERIENCE_QUSTION, 2023, years, [30000] * 6)
+        rebuild_salary_aggregates()
+
+        rows = get_salary_stats_by_answer(YEARS_OF_EXPERIENCE_QUSTION, [2023])
+        self.assertEqual([row["answer"] for row in rows], ["2", "10", "15+"])
+
+
+def create_records(count: int, year: int = 2023) -> list[dict]:
+    return [
+        {
+            "user_id": i,
+            "question": QUESTION,
+            "answer": "Analyst",
+            "year": year,
+            "monthly_salary": 30000 + i,
+            "created_at": "2023-05-01T12:00:00",
+        }
+        for i in range(count)
+    ]
+
+
+class LoadSurveyDataTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = Path(directory.name)
+
+    def write_json(self, records: list[dict]) -> Path:
+        file_path = self.directory / "survey.json"
+        file_path.write_text(json.dumps(records, indent=2))
+        return file_path
+
+    def test_json_records_are_parsed_incrementally(self):
+        records = create_records(20)
+        with open(self.write_json(records)) as file:
+            self.assertEqual(list(iter_json_records(file, read_size=16)), records)
+
+    def test_json_records_are_parsed_without_whitespace_or_when_truncated(self):
+        records = create_records(5)
+        compact = json.dumps(records, separators=(",", ":"))
+        for read_size in [1, 7, len(compact)]:
+            with self.subTest(read_size=read_size):
+                self.assertEqual(
+                    list(iter_json_records(StringIO(compact), read_size)), records
+                )
+        self.assertEqual(list(iter_json_records(StringIO(" [ ] "))), [])
+        with self.assertRaises(json.JSONDecodeError):
+            list(iter_json_records(StringIO(compact[:-20]), read_size=7))
+
+    def test_loading_rebuilds_the_salary_aggregates(self):
+        file_path = self.write_json(create_records(6))
+        call_command("load_survey_data", str(file_path), stdout=StringIO())
+
+        aggregate = SalaryAggregate.objects.get()
+        self.assertEqual((aggregate.year, aggregate.count), (2023, 6))
+        self.assertTrue(SurveyDataLoad.objects.get().finished)
+
+    def test_interrupted_load_is_resumed(self):
+        file_path = self.write_json(create_records(10))
+        SurveyDataLoad.objects.create(
+            file_name=file_path.name,
+            file_size=file_path.stat().st_size,
+            rows_loaded=4,
+        )
+        call_command(
+            "load_survey_data", str(file_path), "--batch_size=3", stdout=StringIO()
+        )
+
+        self.assertEqual(
+            list(SurveyRespondent.objects.values_list("user_id", flat=True)),
+            list(range(4, 10)),
+        )
+        self.assertEqual(SurveyDataLoad.objects.get().rows_loaded, 10)
+
+    def test_reloading_requires_upsert_or_replace(self):
+        file_path = self.write_json(create_records(6))
+        call_command("load_survey_data", str(file_path), stdout=StringIO())
+
+        with self.assertRaises(CommandError):
+            call_command("load_survey_data", str(file_path), stdout=StringIO())
+
+        records = create_records(6)
+        records[0]["monthly_salary"] = 90000
+        file_path = self.write_json(records)
+        call_command("load_survey_data", str(file_path), "--upsert", stdout=StringIO())
+        self.assertEqual(SurveyAnswer.objects.count(), 6)
+        self.assertEqual(SurveyRespondent.objects.get(user_id=0).monthly_salary, 90000)
+
+    def test_replace_year_swaps_only_that_year(self):
+        call_command(
+            "load_survey_data",
+            str(self.write_json(create_records(6, 2022) + create_records(8, 2023))),
+            stdout=StringIO(),
+        )
+        self.assertEqual(get_salary_stats_by_answer(QUESTION, [2023])[0]["count"], 8)
+
+        call_command(
+            "load_survey_data",
+            str(self.write_json(create_records(7, 2022) + create_records(6, 2023))),
+            "--replace-year=2023",
+            stdout=StringIO(),
+        )
+        self.assertEqual(SurveyRespondent.objects.filter(year=2022).count(), 6)
+        self.assertEqual(SurveyAnswer.objects.filter(respondent__year=2023).count(), 6)
+        self.assertEqual(get_salary_stats_by_answer(QUESTION, [2023])[0]["count"], 6)
+
+    @skipUnless(importlib.util.find_spec("pyarrow"), "pyarrow is not installed")
+    def test_parquet_files_are_loaded_in_batches(self):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        file_path = self.directory / "survey.parquet"
+        pq.write_table(pa.Table.from_pylist(create_records(7)), file_path)
+        call_command(
+            "load_survey_data", str(file_path), "--batch_size=2", stdout=StringIO()
+        )
+
+        self.assertEqual(SurveyAnswer.objects.count(), 7)
+        self.assertEqual(SalaryAggregate.objects.get().count, 7)
+
+
+class SurveyDataCacheTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        create_answers(QUESTION, 2023, "Analyst", [30000])
+        create_answers("What is your gender?", 2023, "Woman", [30000])
+
+    def test_function_results_are_cached_per_argument(self):
+        self.assertEqual(len(get_question_choices([])), 2)
+        self.assertEqual(
+            get_question_choices([QUESTION]), [("What is your gender?",) * 2]
+        )
+
+        with self.assertNumQueries(0):
+            get_question_choices([])
+
+    def test_saving_survey_data_invalidates_cached_results(self):
+        self.assertEqual(len(get_question_choices([])), 2)
+        with self.captureOnCommitCallbacks(execute=True):
+            SurveyQuestion.objects.create(text="Where do you work?")
+
+        self.assertEqual(len(get_question_choices([])), 3)
+
+
+class SingleFlightCacheTest(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.calls = 0
+
+        @cache_query_result(timeout=60, namespace="test")
+        def slow_query(value):
+            self.calls += 1
+            time.sleep(0.2)
+            return value * 2
+
+        self.slow_query = slow_query
+        self.cache_key = make_cache_key(
+            "query", "test", slow_query.__wrapped__, (21,), {}
+        )
+
+    def test_concurrent_misses_compute_once(self):
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(self.slow_query(21)))
+            for _ in range(5)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(results, [42] * 5)
+        self.assertEqual(self.calls, 1)
+
+    def test_stale_value_is_served_while_another_process_recomputes(self):
+        cache.set(self.cache_key, (0, time.time() - 1))
+        cache.add(f"lock:{self.cache_key}", True)
+
+        self.assertEqual(self.slow_query(21), 0)
+        self.assertEqual(self.calls, 0)
+
+    def test_stale_value_is_recomputed_by_the_lock_holder(self):
+        cache.set(self.cache_key, (0, time.time() - 1))
+
+        self.assertEqual(self.slow_query(21), 42)
+        self.assertEqual(self.slow_query(21), 42)
+        self.assertEqual(self.calls, 1)
+
+
+class MonthlyCounterTest(TestCase):
+    def setUp(self):
+        self.users = [
+            User.objects.create_user(email=f"user{i}@ddsc.io", password="password")
+            for i in range(3)
+        ]
+        self.month = get_month(timezone.now())
+
+    def get_counts(self) -> dict[str, int]:
+        return dict(
+            MonthlyCounter.objects.filter(month=self.month).values_list("name", "total")
+        )
+
+    def test_counters_follow_creates_and_deletes(self):
+        self.assertEqual(self.get_counts(), {"users": 3})
+        self.users[0].delete()
+        self.assertEqual(self.get_counts(), {"users": 2})
+
+    def test_backfill_matches_signal_counts(self):
+        counts = self.get_counts()
+        MonthlyCounter.objects.all().delete()
+        call_command("backfill_monthly_counters", stdout=StringIO())
+        self.assertEqual(self.get_counts(), counts)
+
+    def test_dashboard_reads_the_counters(self):
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse("stats:stats"))
+        self.assertEqual(response.context["user_stats"]["data"], [3])
+
+
+class SalarySurveyDataTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        create_answers(QUESTION, 2023, "Analyst", [30000, 31000, 32000] * 2)
+        rebuild_salary_aggregates()
+        self.params = {"question": QUESTION, "year": [2023]}
+
+    def test_json_data_is_revalidated_with_etag(self):
+        url = reverse("stats:salary_survey_json")
+        response = self.client.get(url, self.params)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["median"], [31000])
+        self.assertIn("public", response["Cache-Control"])
+
+        response = self.client.get(
+            url, self.params, HTTP_IF_NONE_MATCH=response["ETag"]
+        )
+        self.assertEqual(response.status_code, 304)
+
+        bump_cache_generation(SURVEY_CACHE_NAMESPACE)
+        response = self.client.get(
+            url, self.params, HTTP_IF_NONE_MATCH=response["ETag"]
+        )
+        self.assertEqual(response.status_code, 200)
+
+    def test_csv_data(self):
+        response = self.client.get(reverse("stats:salary_survey_csv"), self.params)
+        self.assertEqual(response["Content-Type"], "text/csv")
+        self.assertEqual(
+            response.content.decode().splitlines(),
+            [
+                "answer,count,average,min,max,median",
+                "Analyst,6,31000,30000,32000,31000",
+            ],
+        )
+
+    def test_invalid_question_is_rejected(self):
+        response = self.client.get(
+            reverse("stats:salary_survey_json"), {"question": "?", "year": [2023]}
+        )
+        self.assertEqual(response.status_code, 400)
+
+    def test_chart_and_data_share_the_cached_results(self):
+        self.client.post(reverse("stats:salary_survey"), self.params)
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse("stats:salary_survey_json"), self.params)
+        self.assertEqual(response.json()["median"], [31000])
+
+
+@skipUnless(importlib.util.find_spec("numpy"), "numpy is not installed")
+class SurveyEngineTest(TestCase):
+    TITLES = ["Analyst", "Engineer", "Scientist"]
+
+    def setUp(self):
+        cache.clear()
+        random.seed(42)
+        records = []
+        for user_id in range(300):
+            year = 2022 + user_id % 2
+            salary = random.choice([None, 0, *range(30000, 60000, 250)])
+            answers = {
+                QUESTION: random.choice(self.TITLES + [""]),
+                YEARS_OF_EXPERIENCE_QUSTION: random.choice(["1", "2", "15+"]),
+            }
+            for question, answer in answers.items():
+                records.append(
+                    {
+                        "user_id": user_id,
+                        "question": question,
+                        "answer": answer,
+                        "year": year,
+                        "monthly_salary": salary,
+                        "created_at": timezone.now(),
+                    }
+                )
+        SurveyWriter().write(records)
+        rebuild_salary_aggregates()
+
+    def test_engine_matches_the_aggregates(self):
+        for question in [QUESTION, YEARS_OF_EXPERIENCE_QUSTION]:
+            for years in [[2022], [2023], [2022, 2023]]:
+                expected = get_salary_stats_by_answer(question, years)
+                with override_settings(STATS_USE_NUMPY_ENGINE=True):
+                    cache.clear()
+                    self.assertEqual(
+                        get_salary_stats_by_answer(question, years), expected
+                    )
+
+    def test_salaries_can_be_grouped_by_two_questions(self):
+        from .engine import get_survey_engine
+
+        rows = get_survey_engine().grouped_salary_stats(
+            [QUESTION, YEARS_OF_EXPERIENCE_QUSTION],
+            [2022, 2023],
+            quantiles=(0.25, 0.5, 0.75),
+        )
+        self.assertTrue(rows)
+        for row in rows:
+            salaries = sorted(
+                SurveyRespondent.objects.filter(
+                    monthly_salary__gt=0,
+                    answers__question__text=QUESTION,
+                    answers__answer=row["answers"][0],
+                )
+                .filter(
+                    answers__question__text=YEARS_OF_EXPERIENCE_QUSTION,
+                    answers__answer=row["answers"][1],
+                )
+                .values_list("monthly_salary", flat=True)
+            )
+            self.assertEqual(row["count"], len(salaries))
+            self.assertEqual(
+                row["quantiles"][0.25], salaries[math.ceil(len(salaries) * 0.25) - 1]
+            )
+            self.assertEqual((row["min"], row["max"]), (salaries[0], salaries[-1]))
+
+
+class BenchmarkStatsTest(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_results_are_reported_and_the_data_rolled_back(self):
+        stdout = StringIO()
+        call_command(
+            "benchmark_stats",
+            "--rows=400",
+            "--rows=800",
+            "--users=20",
+            "--repeat=1",
+            stdout=stdout,
+        )
+
+        results = json.loads(stdout.getvalue())
+        self.assertEqual(
+            [scale["survey_rows"] for scale in results["scales"]], [400, 800]
+        )
+        self.assertEqual(
+            set(results["scales"][0]["results"]),
+            {
+                "get_salary_stats_by_answer",
+                "get_object_stats_by_month",
+                "frequency_view",
+                "stats_view",
+            },
+        )
+        timings = results["scales"][0]["results"]["stats_view"]
+        self.assertEqual(set(timings), {"cold", "warm"})
+        self.assertFalse(SurveyRespondent.objects.exists())
+        self.assertFalse(User.objects.exists())
+        self.assertFalse(MonthlyCounter.objects.exists())
@@ -1,9 +1,21 @@
 from django.urls import path
-from .views import StatsView, FrequencyView
+from .views import StatsView, FrequencyView, salary_survey_data
 
 app_name = "stats"
 
 urlpatterns = [
     path("dashboard/", StatsView.as_view(), name="stats"),
     path("salary-survey/", FrequencyView.as_view(), name="salary_survey"),
+    path(
+        "salary-survey/data.json",
+        salary_survey_data,
+        {"data_format": "json"},
+        name="salary_survey_json",
+    ),
+    path(
+        "salary-survey/data.csv",
+        salary_survey_data,
+        {"data_format": "csv"},
+        name="salary_survey_csv",
+    ),
 ]
@@ -1,43 +1,40 @@
+import csv
+import hashlib
 import math
 from itertools import accumulate
 
 from django.contrib import messages
+from django.http import HttpResponse, JsonResponse
 from django.shortcuts import render, redirect
-from django.utils.decorators import method_decorator
+from django.utils.cache import patch_cache_control
 from django.utils.translation import gettext_lazy as _
 from django.views import View
-from django.views.decorators.cache import cache_page
+from django.views.decorators.http import condition, require_safe
 
+from .counters import get_monthly_counter_series
+from .decorators import get_cache_generation, get_cache_generation_changed
 from .forms import QuestionForm, get_exclude_list
-from .models import SurveyData
+from .models import SURVEY_CACHE_NAMESPACE, SurveyQuestion, SurveyRespondent
 from .queries import (
+    SALARY_STATS_FIELDS,
     get_salary_stats_by_answer,
-    get_object_stats_by_month,
     queryset_to_lists,
     get_queryset_fields,
 )
 
 
 class StatsView(View):
-    @method_decorator(cache_page(60 * 60))
     def get(self, request, *args, **kwargs):
-        user_stats = get_object_stats_by_month("users", "User", "date_joined")
-        member_stats = get_object_stats_by_month("members", "Member", "created")
-        event_stats = get_object_stats_by_month(
-            "events",
-            "EventRegistration",
-            "created",
-        )
+        return render(request, "stats/stats.html", get_dashboard_stats())
 
-        return render(
-            request,
-            "stats/stats.html",
-            {
-                "user_stats": get_labels_and_data(user_stats),
-                "member_stats": get_labels_and_data(member_stats),
-                "event_stats": get_labels_and_data(event_stats),
-            },
-        )
+
+def get_dashboard_stats() -> dict:
+    series = get_monthly_counter_series()
+    return {
+        "user_stats": get_labels_and_data(series["users"]),
+        "member_stats": get_labels_and_data(series["members"]),
+        "event_stats": get_labels_and_data(series["event_registrations"]),
+    }
 
 
 def get_labels_and_data(queryset):
@@ -50,7 +47,7 @@ def get_labels_and_data(queryset):
 
 
 def calculate_stepsize(data: list[int], number_of_steps: int):
-    max_number = max(data)
+    max_number = max(data, default=0)
     return _round_to_nearest_integer(max_number / number_of_steps, nearest=50)
 
 
@@ -61,15 +58,16 @@ def _round_to_nearest_integer(number: float, nearest: int):
 class FrequencyView(View):
     def get(self, request, *args, **kwargs):
         question = (
-            SurveyData.objects.exclude(question__in=get_exclude_list())
-            .values("question")
+            SurveyQuestion.objects.exclude(text__in=get_exclude_list())
+            .order_by("text")
+            .values_list("text", flat=True)
             .last()
         )
-        year = SurveyData.objects.values("year").first()
-        form = QuestionForm(initial=question | year)
+        year = SurveyRespondent.objects.values("year").first()
+        form = QuestionForm(initial={"question": question} | year)
 
         salary_data = self.__get_salary_stats_by_answer(
-            question.get("question"),
+            question,
             [year.get("year")],
         )
         return self.__render_chart(
@@ -114,3 +112,46 @@ class FrequencyView(View):
                 **salary_data,
             },
         )
+
+
+SALARY_SURVEY_DATA_MAX_AGE = 60 * 60
+
+
+def get_salary_survey_data_etag(request, data_format: str) -> str:
+    generation = get_cache_generation(SURVEY_CACHE_NAMESPACE)
+    query = request.GET.urlencode()
+    return hashlib.md5(f"{generation}:{data_format}:{query}".encode()).hexdigest()
+
+
+def get_salary_survey_data_last_modified(request, data_format: str):
+    return get_cache_generation_changed(SURVEY_CACHE_NAMESPACE)
+
+
+@require_safe
+@condition(
+    etag_func=get_salary_survey_data_etag,
+    last_modified_func=get_salary_survey_data_last_modified,
+)
+def salary_survey_data(request, data_format: str):
+    """
+    The salary statistics of FrequencyView for ?question=&year=, as JSON or CSV.
+    Validators follow the survey data cache generation, so clients and shared
+    caches revalidate with a 304 until the survey data changes.
+    """
+    form = QuestionForm(request.GET)
+    if not form.is_valid():
+        return JsonResponse({"errors": form.errors}, status=400)
+
+    rows = get_salary_stats_by_answer(
+        form.cleaned_data["question"],
+        years=form.cleaned_data["year"],
+    )
+    if data_format == "csv":
+        response = HttpResponse(content_type="text/csv")
+        writer = csv.DictWriter(response, fieldnames=SALARY_STATS_FIELDS)
+        writer.writeheader()
+        writer.writerows(rows)
+    else:
+        response = JsonResponse(queryset_to_lists(rows, SALARY_STATS_FIELDS))
+    patch_cache_control(response, public=True, max_age=SALARY_SURVEY_DATA_MAX_AGE)
+    return response
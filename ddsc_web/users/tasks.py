@@ -8,6 +8,8 @@ from django.utils.translation import gettext_lazy as _
 from ddsc_web.celery import celery_app
 from .models import User
 from django.contrib.auth.forms import PasswordResetForm
+from django.core.mail import EmailMessage
+from shared.tasks import send_or_queue_email
 
 logger = get_task_logger(__name__)
 
@@ -26,7 +28,7 @@ def send_activation_email(domain, scheme, pk):
             "token": account_activation_token.make_token(user),
         },
     )
-    user.email_user(mail_subject, message)
+    send_or_queue_email(EmailMessage(mail_subject, message, to=[user.email]))
     logger.info(f"Activation email sent to {user}")
 
 